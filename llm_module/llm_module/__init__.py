@@ -11,16 +11,32 @@ This module teaches the 5 core concepts of working with LLMs:
 """
 
 # Raw API
-from .llm_client import call_gemini
+from .llm_client import call_gemini, call_gemini_async, call_gemini_streaming, batch_generate, configure_cache, RETRYABLE_ERRORS
+from .cache import ResponseCache
 
 # Prompts
-from .prompts import format_prompt, get_template, TEMPLATES, SYSTEM_INSTRUCTION
+from .prompts import format_prompt, format_prompt_batch, get_template, TEMPLATES, TEMPLATE_SCHEMAS, SYSTEM_INSTRUCTION
 
 # Parsing
-from .parser import parse_json, validate_choice, validate_length, ParseResult
+from .parser import parse_json, parse_json_batch, json_complete, validate_choice, validate_length, ParseResult
 
 # Safety
-from .safety import retry_on_failure, call_with_fallback, call_with_retry_and_fallback
+from .safety import (
+    retry_on_failure,
+    retry_on_failure_async,
+    retry_on_failure_batch,
+    call_with_fallback,
+    call_with_retry_and_fallback,
+    CircuitBreaker,
+    CircuitOpenError,
+    should_wait,
+    is_transient,
+    memoize,
+    RetryPolicy,
+    RetryResult,
+    with_policy,
+    retryable,
+)
 
 # Logging
 from .logger import get_logger, Logger
@@ -28,20 +44,41 @@ from .logger import get_logger, Logger
 __all__ = [
     # Raw API
     "call_gemini",
+    "call_gemini_async",
+    "call_gemini_streaming",
+    "batch_generate",
+    "configure_cache",
+    "RETRYABLE_ERRORS",
+    "ResponseCache",
     # Prompts
     "format_prompt",
+    "format_prompt_batch",
     "get_template",
     "TEMPLATES",
+    "TEMPLATE_SCHEMAS",
     "SYSTEM_INSTRUCTION",
     # Parsing
     "parse_json",
+    "parse_json_batch",
+    "json_complete",
     "validate_choice",
     "validate_length",
     "ParseResult",
     # Safety
     "retry_on_failure",
+    "retry_on_failure_async",
+    "retry_on_failure_batch",
     "call_with_fallback",
     "call_with_retry_and_fallback",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "should_wait",
+    "is_transient",
+    "memoize",
+    "RetryPolicy",
+    "RetryResult",
+    "with_policy",
+    "retryable",
     # Logging
     "get_logger",
     "Logger",
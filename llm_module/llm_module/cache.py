@@ -0,0 +1,196 @@
+"""Response caching for repeated (or near-identical) prompts."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # Semantic tier needs NumPy; exact tier works without it
+    np = None
+
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+class _SemanticIndex:
+    """
+    Embeddings of cached prompts for one model, scored in one BLAS call.
+
+    Rows are L2-normalized on insert, so cosine similarity against every
+    cached prompt is a single matrix-vector product. The matrix grows by
+    doubling (up to max_size rows), then the oldest row is overwritten.
+    Each row keeps its insert time, so expired rows are never matched.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._mat = None  # float32, C-contiguous, shape (capacity, D)
+        self._times = None  # float64 insert time (time.monotonic) per row
+        self._responses: List[str] = []
+        self._size = 0
+        self._next = 0  # row to write next once the index is full
+
+    def add(self, vector, response: str, timestamp: float):
+        """Normalize an embedding and store it with its response."""
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        if self._mat is None:
+            self._mat = np.empty((min(16, self.max_size), vector.shape[0]), dtype=np.float32)
+            self._times = np.empty(self._mat.shape[0], dtype=np.float64)
+
+        if self._size < self.max_size:
+            if self._size == self._mat.shape[0]:
+                grown = np.empty(
+                    (min(2 * self._size, self.max_size), self._mat.shape[1]),
+                    dtype=np.float32,
+                )
+                grown[:self._size] = self._mat
+                self._mat = grown
+                times = np.empty(grown.shape[0], dtype=np.float64)
+                times[:self._size] = self._times
+                self._times = times
+            row = self._size
+            self._size += 1
+            self._responses.append(response)
+        else:
+            row = self._next
+            self._next = (self._next + 1) % self.max_size
+            self._responses[row] = response
+        self._mat[row] = vector
+        self._times[row] = timestamp
+
+    def search(self, vector, oldest: float):
+        """
+        Return (best similarity, response) among rows stored at or after
+        `oldest`, or (-1.0, None) if there are none.
+        """
+        if self._size == 0:
+            return -1.0, None
+        query = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        sims = self._mat[:self._size] @ query
+        sims[self._times[:self._size] < oldest] = -np.inf
+        idx = int(np.argmax(sims))
+        if sims[idx] == -np.inf:
+            return -1.0, None
+        return float(sims[idx]), self._responses[idx]
+
+
+class ResponseCache:
+    """
+    Two-tier cache for model responses.
+
+    1. Exact tier: hash of (model, prompt) -> response, LRU with TTL
+    2. Semantic tier: prompt embedding -> response, served when the
+       cosine similarity to a cached prompt is >= similarity_threshold
+
+    The semantic tier costs one embedding call per lookup (reused when the
+    miss is then stored with put), so it is off by default. Only enable
+    it for prompts where a "close enough" answer is acceptable (e.g.,
+    free-form Q&A), NOT for extraction templates that differ only in the
+    {text} slot.
+
+    Safe to share between threads; embedding calls run outside the lock.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: float = 3600.0,
+        semantic: bool = False,
+        similarity_threshold: float = 0.92,
+        embedding_model: str = EMBEDDING_MODEL,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.semantic = semantic and np is not None
+        self.similarity_threshold = similarity_threshold
+        self.embedding_model = embedding_model
+
+        # Exact tier: key -> (timestamp, response)
+        self._exact = OrderedDict()
+
+        # Semantic tier: model -> embeddings of its cached prompts
+        self._semantic: Dict[str, _SemanticIndex] = {}
+
+        # (key, embedding) of the last semantic miss, so the put() that
+        # usually follows doesn't embed the same prompt again
+        self._last_miss = None
+
+        self._lock = threading.Lock()
+
+    def _key(self, prompt: str, model: str) -> bytes:
+        """Hash (model, prompt) into a compact dict key."""
+        digest = hashlib.blake2b(prompt.encode(), digest_size=16)
+        digest.update(model.encode())
+        return digest.digest()
+
+    def _embed(self, prompt: str):
+        """Embed a prompt with the Gemini embedding model."""
+        import google.generativeai as genai
+
+        result = genai.embed_content(model=self.embedding_model, content=prompt)
+        return np.asarray(result["embedding"], dtype=np.float32)
+
+    def get(self, prompt: str, model: str) -> Optional[str]:
+        """Return a cached response for this prompt, or None on a miss."""
+        key = self._key(prompt, model)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                timestamp, response = entry
+                if time.monotonic() - timestamp <= self.ttl:
+                    self._exact.move_to_end(key)
+                    return response
+                del self._exact[key]
+
+            if not self.semantic or model not in self._semantic:
+                return None
+
+        vector = self._embed(prompt)
+        with self._lock:
+            index = self._semantic.get(model)
+            if index is None:  # Cleared while embedding
+                return None
+            best, response = index.search(vector, time.monotonic() - self.ttl)
+            if best >= self.similarity_threshold:
+                return response
+            self._last_miss = (key, vector)
+        return None
+
+    def put(self, prompt: str, model: str, response: str):
+        """Store a response for this prompt."""
+        key = self._key(prompt, model)
+        now = time.monotonic()
+        with self._lock:
+            self._exact[key] = (now, response)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+
+            if not self.semantic:
+                return
+
+            last_miss, self._last_miss = self._last_miss, None
+
+        if last_miss is not None and last_miss[0] == key:
+            vector = last_miss[1]
+        else:
+            vector = self._embed(prompt)
+
+        with self._lock:
+            index = self._semantic.get(model)
+            if index is None:
+                index = self._semantic[model] = _SemanticIndex(self.max_size)
+            index.add(vector, response, now)
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+            self._last_miss = None
+
+    def __len__(self) -> int:
+        return len(self._exact)
@@ -0,0 +1,46 @@
+"""Terminal input for the asyncio chat loops (main.py and roboLLM.py)."""
+
+import asyncio
+import contextlib
+import sys
+import threading
+
+
+def _settle(future: asyncio.Future, value, error):
+    """Resolve future unless it was already cancelled."""
+    if future.done():
+        return
+    if error is None:
+        future.set_result(value)
+    else:
+        future.set_exception(error)
+
+
+async def read_input(prompt: str) -> str:
+    """
+    Print prompt and read one line from stdin without blocking the event loop.
+    
+    Raises:
+        EOFError: If stdin is closed
+    """
+    # Not asyncio.to_thread(input): on Ctrl-C, asyncio.run waits for
+    # executor threads, and one blocked in input() never returns. A daemon
+    # thread doesn't hold up the exit, and reading the unbuffered stream
+    # means it holds no stdin lock that interpreter shutdown would need.
+    loop = asyncio.get_running_loop()
+    line = loop.create_future()
+    
+    def read():
+        try:
+            raw = sys.stdin.buffer.raw.readline()
+            if not raw:
+                raise EOFError
+            value, error = raw.decode(sys.stdin.encoding, "replace").rstrip("\r\n"), None
+        except Exception as e:
+            value, error = None, e
+        with contextlib.suppress(RuntimeError):  # Loop already closed
+            loop.call_soon_threadsafe(_settle, line, value, error)
+    
+    print(prompt, end="", flush=True)
+    threading.Thread(target=read, daemon=True).start()
+    return await line
@@ -8,18 +8,48 @@ This file shows:
 4. Prompt change without modifying core logic
 """
 
+import asyncio
+import logging
 import os
 import json
-from llm_client import call_gemini
-from prompts import format_prompt
+from typing import Any, Dict, Optional
+from llm_client import call_gemini, batch_generate, RETRYABLE_ERRORS
+from prompts import format_prompt, format_prompt_batch, TEMPLATE_SCHEMAS
 from parser import parse_json, validate_choice
 from safety import call_with_retry_and_fallback
 from logger import get_logger
 
+try:
+    import orjson  # Optional: faster JSON serialization
+except ImportError:
+    orjson = None
+
 
 logger = get_logger(enabled=True)
 
 
+# Input text for each experiment (all use the "structured_info" template)
+EXPERIMENT_TEXTS = {
+    1: "Alice is 28 years old and lives in San Francisco. She works as a software engineer.",
+    2: "John is thirty-five. He's from NYC. Unemployed.",
+    3: "Mike, 42, from Boston",
+    4: "Sarah, 31, lives in Seattle",
+}
+
+# Experiments whose extraction is sent as ONE batched call.
+# Experiment 2 is left out so its raw (possibly malformed) output is shown
+# as-is, and experiment 3 demonstrates retry + fallback on its own call.
+BATCHED_EXPERIMENTS = (1, 4)
+
+
+def to_json(data, indent: bool = False) -> str:
+    """Serialize data as JSON (with orjson when installed)."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(data, option=option).decode()
+    return json.dumps(data, indent=2 if indent else None)
+
+
 def print_section(title: str):
     """Print a formatted section header."""
     print("\n" + "="*70)
@@ -33,7 +63,15 @@ def print_subsection(title: str):
     print("-" * 70)
 
 
-def experiment_1_successful_json():
+def show_batched_response(batched: Dict[str, Any]) -> str:
+    """Print the raw batched response and return this experiment's element as JSON text."""
+    print(f"Raw response from model (whole batch):\n{batched['response']}\n")
+    element = to_json(batched["element"])
+    print(f"This experiment's element (#{batched['index'] + 1} of the array):\n{element}\n")
+    return element
+
+
+def experiment_1_successful_json(batched: Optional[Dict[str, Any]] = None):
     """
     Experiment 1: Successful structured response
     
@@ -42,6 +80,10 @@ def experiment_1_successful_json():
     - API call with metadata tracking
     - Successful validation with schema
     - Full traceability of the operation
+    
+    Args:
+        batched: This experiment's share of the batched call, if available
+                 (see prefetch_responses); otherwise it calls the API itself
     """
     print_section("EXPERIMENT 1: Successful Structured Response")
     
@@ -51,33 +93,40 @@ def experiment_1_successful_json():
         return
     
     print_subsection("1. Define output schema")
-    required_keys = ["name", "age", "city"]
+    required_keys = TEMPLATE_SCHEMAS["structured_info"]
     print(f"Required JSON keys: {required_keys}")
     
     print_subsection("2. Create prompt with format instructions")
-    text_to_extract = "Alice is 28 years old and lives in San Francisco. She works as a software engineer."
+    text_to_extract = EXPERIMENT_TEXTS[1]
     prompt = format_prompt(
         "structured_info",
         text=text_to_extract
     )
     print(f"Input text: {text_to_extract}")
-    print(f"Prompt sent to model:\n{prompt}\n")
+    if batched is None:
+        print(f"Prompt sent to model:\n{prompt}\n")
+    else:
+        print(f"Prompt sent to model (one batched call for experiments {BATCHED_EXPERIMENTS}):")
+        print(f"{batched['prompt']}\n")
     
     print_subsection("3. Call API")
-    response = call_gemini(api_key, prompt)
-    print(f"Response from model:\n{response}\n")
+    if batched is None:
+        response = call_gemini(api_key, prompt)
+        print(f"Response from model:\n{response}\n")
+    else:
+        response = show_batched_response(batched)
     
     print_subsection("4. Validate response against schema")
     result = parse_json(response, required_keys=required_keys, allow_extra_keys=False)
     
     # Print validation trace
-    for step in result.validation_steps:
+    for step in result.steps_str():
         print(f"  {step}")
     
     if result.success:
         logger.success(f"Validation passed! Extracted data: {result.data}")
         print(f"\nExtracted structured data:")
-        print(json.dumps(result.data, indent=2))
+        print(to_json(result.data, indent=True))
     else:
         logger.error(f"Validation failed: {result.error}")
 
@@ -103,7 +152,7 @@ def experiment_2_invalid_response():
     
     print_subsection("1. Create a challenging prompt (might get invalid output)")
     # We intentionally ask for something that might break the format
-    text = "John is thirty-five. He's from NYC. Unemployed."
+    text = EXPERIMENT_TEXTS[2]
     prompt = format_prompt("structured_info", text=text)
     print(f"Input (intentionally vague): {text}")
     print(f"Prompt:\n{prompt}\n")
@@ -113,11 +162,11 @@ def experiment_2_invalid_response():
     print(f"Response:\n{response}\n")
     
     print_subsection("3. Try strict validation")
-    required_keys = ["name", "age", "city"]
+    required_keys = TEMPLATE_SCHEMAS["structured_info"]
     result = parse_json(response, required_keys=required_keys, allow_extra_keys=False)
     
     # Print validation steps
-    for step in result.validation_steps:
+    for step in result.steps_str():
         print(f"  {step}")
     
     if result.success:
@@ -148,33 +197,31 @@ def experiment_3_failure_handling():
     
     print_subsection("1. Set up retry + fallback strategy")
     max_attempts = 2
-    fallback_value = '{"name": "unknown", "age": "unknown", "city": "unknown"}'
+    fallback_value = '{"name": "unknown", "age": "unknown", "location": "unknown"}'
     print(f"Strategy: Try {max_attempts} times, then use fallback")
     print(f"Fallback value: {fallback_value}")
     
     print_subsection("2. Call with retry + fallback")
-    text = "Mike, 42, from Boston"
+    text = EXPERIMENT_TEXTS[3]
     prompt = format_prompt("structured_info", text=text)
     
-    # This combines retry and fallback. The call may return either:
-    # - a tuple (response_text, metadata) when successful, or
-    # - the fallback_value (string) when retries are exhausted.
-    raw = call_with_retry_and_fallback(
+    # This combines retry and fallback: the response text, or the
+    # fallback_value when retries are exhausted
+    response_text = call_with_retry_and_fallback(
         call_gemini,
         args=(api_key, prompt),
         fallback_value=fallback_value,
         max_attempts=max_attempts,
+        retry_on=RETRYABLE_ERRORS,
     )
-
-    response_text = raw
-
+    
     print(f"Response received (may be real API response or fallback)\n")
 
     print_subsection("3. Parse the response (from API or fallback)")
-    required_keys = ["name", "age", "city"]
+    required_keys = TEMPLATE_SCHEMAS["structured_info"]
     result = parse_json(response_text, required_keys=required_keys, allow_extra_keys=False)
     
-    for step in result.validation_steps:
+    for step in result.steps_str():
         print(f"  {step}")
     
     if result.success:
@@ -185,7 +232,7 @@ def experiment_3_failure_handling():
         print(f"This means even our fallback doesn't match schema")
 
 
-def experiment_4_prompt_change():
+def experiment_4_prompt_change(batched: Optional[Dict[str, Any]] = None):
     """
     Experiment 4: Prompt change without modifying core logic
     
@@ -200,6 +247,9 @@ def experiment_4_prompt_change():
     - This is expected and acknowledged in the design
     - See prompts.py: each prompt has explicit format requirements
       to reduce variation, but won't eliminate it completely
+    
+    Args:
+        batched: This experiment's share of the batched call, if available
     """
     print_section("EXPERIMENT 4: Prompt Change Without Code Changes")
     
@@ -209,7 +259,7 @@ def experiment_4_prompt_change():
         return
     
     print_subsection("1. Define the text to extract")
-    text = "Sarah, 31, lives in Seattle"
+    text = EXPERIMENT_TEXTS[4]
     print(f"Text: {text}")
     
     print_subsection("2. Call with ORIGINAL prompt")
@@ -217,8 +267,13 @@ def experiment_4_prompt_change():
     prompt_v1 = format_prompt("structured_info", text=text)
     print(f"Prompt template version 1:\n{prompt_v1[:200]}...\n")
     
-    response_v1 = call_gemini(api_key, prompt_v1)
-    result_v1 = parse_json(response_v1, required_keys=["name", "age", "city"])
+    if batched is None:
+        response_v1 = call_gemini(api_key, prompt_v1)
+    else:
+        print(f"Sent as part of one batched call for experiments {BATCHED_EXPERIMENTS}:")
+        print(f"{batched['prompt']}\n")
+        response_v1 = show_batched_response(batched)
+    result_v1 = parse_json(response_v1, required_keys=TEMPLATE_SCHEMAS["structured_info"])
     
     if result_v1.success:
         logger.success(f"Version 1 succeeded: {result_v1.data}")
@@ -258,8 +313,60 @@ To verify non-determinism, try running this experiment twice:
     """)
 
 
+async def prefetch_responses(api_key: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Fetch responses for all experiments before they run.
+    
+    - Experiments 1 and 4 share the "structured_info" template, so their
+      texts go out as ONE batched prompt (one round trip instead of two)
+    - Experiments 2 and 3 send their own prompts in the same
+      batch_generate call; the responses land in the call_gemini cache
+    
+    The experiments still run (and print) in order afterwards.
+    
+    Returns:
+        Experiment number -> {"prompt": batched prompt, "response": raw
+        batched response, "index": position in the array, "element":
+        parsed array element}, so each experiment can show exactly what
+        was sent and received. Empty if any call failed or the batched
+        output was unusable; the experiments then make their own calls.
+    """
+    batch_prompt = format_prompt_batch(
+        "structured_info_batch",
+        [{"text": EXPERIMENT_TEXTS[n]} for n in BATCHED_EXPERIMENTS],
+    )
+    single_prompts = [format_prompt("structured_info", text=EXPERIMENT_TEXTS[n]) for n in (2, 3)]
+    
+    # One event loop drives all three requests over the SDK's async client
+    try:
+        batch_response, *_ = await batch_generate(api_key, [batch_prompt, *single_prompts])
+    except Exception as e:
+        logger.warning(f"Prefetch failed, experiments will call the API: {e}")
+        return {}
+    
+    result = parse_json(batch_response)
+    if not result.success or not isinstance(result.data, list) \
+            or len(result.data) != len(BATCHED_EXPERIMENTS):
+        logger.warning("Batched response is not a JSON array with one element per text")
+        return {}
+    
+    logger.info(f"Batched call answered {len(BATCHED_EXPERIMENTS)} experiments at once")
+    return {
+        number: {
+            "prompt": batch_prompt,
+            "response": batch_response,
+            "index": index,
+            "element": item,
+        }
+        for index, (number, item) in enumerate(zip(BATCHED_EXPERIMENTS, result.data))
+    }
+
+
 def main():
     """Run all experiments."""
+    # Show retry/fallback events from safety.py (experiment 3 relies on them)
+    logging.basicConfig(level=logging.INFO, format="   %(levelname)s | %(message)s")
+    
     print("\n" + "="*70)
     print("  ROBOLLM: MANDATORY REQUIREMENTS VALIDATION")
     print("="*70)
@@ -294,11 +401,17 @@ This file demonstrates all mandatory requirements:
   - Handled by strict format + validation + retry
     """)
     
+    # Issue all API calls up front, then run the experiments in order
+    responses = {}
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        responses = asyncio.run(prefetch_responses(api_key))
+    
     # Run all experiments
-    experiment_1_successful_json()
+    experiment_1_successful_json(responses.get(1))
     experiment_2_invalid_response()
     experiment_3_failure_handling()
-    experiment_4_prompt_change()
+    experiment_4_prompt_change(responses.get(4))
     
     print("\n" + "="*70)
     print("  EXPERIMENTS COMPLETE")
@@ -1,29 +1,121 @@
 
 
+import asyncio
+import functools
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from logger import get_logger
+from cache import ResponseCache
+from prompts import SYSTEM_INSTRUCTION
 
 logger = get_logger(enabled=True)
 
+# Errors worth retrying (pass as retry_on= to the safety.py helpers):
+# rate limits, server overload, timeouts and dropped connections.
+# Everything else (bad key, invalid request, ...) fails the same way twice.
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,    # 429
+    google_exceptions.InternalServerError,  # 500
+    google_exceptions.BadGateway,           # 502
+    google_exceptions.ServiceUnavailable,   # 503
+    google_exceptions.DeadlineExceeded,     # 504
+    TimeoutError,
+    ConnectionError,
+)
 
-def call_gemini(api_key: str, prompt: str, model: str = "gemini-2.5-flash") -> str:
+# Configured model instances, keyed by (api_key, model).
+# Building a GenerativeModel is pure overhead once it exists, so reuse it.
+_MODEL_CACHE = {}
+
+# API key last passed to genai.configure() (None = not configured yet)
+_CONFIGURED_KEY = None
+
+# Responses already received, so repeated prompts skip the network round trip
+# (replace with configure_cache, e.g. to turn on the semantic tier)
+_RESPONSE_CACHE = ResponseCache()
+
+
+def configure_cache(**options) -> ResponseCache:
+    """
+    Replace the response cache shared by all call_gemini* functions.
+    
+    The default cache only matches repeated prompts exactly. Use this to
+    turn on the semantic tier, or to change its size or TTL.
+    
+    Args:
+        **options: Arguments for ResponseCache (max_size, ttl, semantic,
+                   similarity_threshold, embedding_model)
+        
+    Returns:
+        The new cache (e.g. to clear() it later)
+        
+    Example:
+        configure_cache(semantic=True, similarity_threshold=0.95)
+        answer = call_gemini(api_key, "What is Python?")
+    """
+    global _RESPONSE_CACHE
+    
+    cache = ResponseCache(**options)
+    if options.get("semantic") and not cache.semantic:
+        logger.warning("Semantic cache needs NumPy; using exact matches only")
+    _RESPONSE_CACHE = cache
+    return cache
+
+
+def _get_model(api_key: str, model: str) -> genai.GenerativeModel:
+    """
+    Return the configured model instance for (api_key, model).
+    
+    The SDK is configured and the model built only on the first call;
+    after that (including every retry attempt) this is a dict lookup.
+    """
+    global _CONFIGURED_KEY
+    
+    llm_model = _MODEL_CACHE.get((api_key, model))
+    if llm_model is None:
+        # Tell genai library about our API key (only if it changed)
+        if api_key != _CONFIGURED_KEY:
+            genai.configure(api_key=api_key)
+            _CONFIGURED_KEY = api_key
+        
+        # Create a model instance and keep it for later calls.
+        # The system instruction goes in its own slot, not in every prompt.
+        llm_model = genai.GenerativeModel(model, system_instruction=SYSTEM_INSTRUCTION)
+        _MODEL_CACHE[(api_key, model)] = llm_model
+    return llm_model
+
+
+def call_gemini(
+    api_key: str,
+    prompt: str,
+    *,
+    model: str = "gemini-2.5-flash",
+    use_cache: bool = True,
+    return_metadata: bool = False,
+) -> Union[str, Tuple[str, Dict[str, Any]]]:
     """
     Make a raw API call to Gemini.
     
     This is the simplest possible API interaction:
-    1. Configure with API key
-    2. Create model instance
-    3. Send prompt
+    1. Configure with API key (first call only)
+    2. Create model instance (first call only, then reused)
+    3. Send prompt (unless the response is already cached)
     4. Return response text
     
     Args:
         api_key: Your Gemini API key
         prompt: The text to send to the model (should already include format instructions)
         model: Which Gemini model to use
+        use_cache: If True, reuse a cached response for a repeated prompt
+                   (see configure_cache)
+        return_metadata: If True, also return a metadata dict
+                         (model, latency_ms, cached, timestamp)
         
     Returns:
-        The model's response text as a string
+        The model's response text as a string, or
+        (response_text, metadata) if return_metadata=True
         
     Raises:
         Exception: If the API call fails (caller should handle with retry logic)
@@ -34,11 +126,21 @@ def call_gemini(api_key: str, prompt: str, model: str = "gemini-2.5-flash") -> s
     
     NOTE: Logging and tracing happen as side effects only.
     """
-    # Step 1: Tell genai library about our API key
-    genai.configure(api_key=api_key)
+    # Steps 1-2: Configure and get the model instance (cached)
+    llm_model = _get_model(api_key, model)
     
-    # Step 2: Create a model instance
-    llm_model = genai.GenerativeModel(model)
+    if use_cache:
+        cached = _RESPONSE_CACHE.get(prompt, model)
+        if cached is not None:
+            logger.info("API call served from cache")
+            if return_metadata:
+                return cached, {
+                    "model": model,
+                    "latency_ms": 0,
+                    "cached": True,
+                    "timestamp": time.time(),
+                }
+            return cached
     
     # Step 3: Send prompt and get response (with tracing as side effect)
     start_time = time.time()
@@ -51,4 +153,177 @@ def call_gemini(api_key: str, prompt: str, model: str = "gemini-2.5-flash") -> s
     # Logging as side effect only
     logger.info(f"API call completed in {latency_ms:.0f}ms")
     
+    if use_cache:
+        _RESPONSE_CACHE.put(prompt, model, response_text)
+    
+    # Metadata is opt-in, so the default path builds no extra dict
+    if return_metadata:
+        return response_text, {
+            "model": model,
+            "latency_ms": round(latency_ms),
+            "cached": False,
+            "timestamp": time.time(),
+        }
     return response_text
+
+
+def call_gemini_streaming(
+    api_key: str,
+    prompt: str,
+    model: str = "gemini-2.5-flash",
+    on_chunk: Optional[Callable[[str], None]] = None,
+    early_terminate_fn: Optional[Callable[[str], bool]] = None,
+    use_cache: bool = True,
+) -> str:
+    """
+    Streaming version of call_gemini.
+    
+    Reads the response chunk by chunk as the model generates it, so the
+    caller can show text early and stop reading once it has what it needs.
+    
+    Args:
+        api_key: Your Gemini API key
+        prompt: The text to send to the model
+        model: Which Gemini model to use
+        on_chunk: Called with each chunk of text as it arrives
+        early_terminate_fn: Called with the text received so far after each
+                            chunk; if it returns True, the rest of the stream
+                            is skipped (e.g. parser.json_complete)
+        use_cache: If True, reuse a cached response for a repeated prompt
+                   (only fully streamed responses are cached)
+        
+    Returns:
+        The response text received (complete, or up to early termination)
+        
+    Example:
+        from functools import partial
+        from parser import json_complete, parse_json
+        
+        keys = ["name", "age"]
+        response = call_gemini_streaming(
+            api_key, prompt, early_terminate_fn=partial(json_complete, required_keys=keys)
+        )
+        result = parse_json(response, required_keys=keys)
+    """
+    llm_model = _get_model(api_key, model)
+    
+    if use_cache:
+        cached = _RESPONSE_CACHE.get(prompt, model)
+        if cached is not None:
+            logger.info("API call served from cache")
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached
+    
+    start_time = time.time()
+    chunks = []
+    terminated_early = False
+    for chunk in llm_model.generate_content(prompt, stream=True):
+        chunks.append(chunk.text)
+        if on_chunk is not None:
+            on_chunk(chunk.text)
+        if early_terminate_fn is not None and early_terminate_fn("".join(chunks)):
+            terminated_early = True
+            break
+    latency_ms = (time.time() - start_time) * 1000
+    
+    response_text = "".join(chunks)
+    
+    if terminated_early:
+        logger.info(f"Streaming call stopped early after {latency_ms:.0f}ms")
+    else:
+        logger.info(f"Streaming call completed in {latency_ms:.0f}ms")
+        if use_cache:
+            _RESPONSE_CACHE.put(prompt, model, response_text)
+    
+    return response_text
+
+
+async def call_gemini_async(
+    api_key: str,
+    prompt: str,
+    model: str = "gemini-2.5-flash",
+    use_cache: bool = True,
+) -> str:
+    """
+    Async version of call_gemini.
+    
+    Runs the blocking call in a worker thread, so several calls can wait
+    on the network at the same time:
+    
+        responses = await asyncio.gather(
+            call_gemini_async(api_key, prompt_a),
+            call_gemini_async(api_key, prompt_b),
+        )
+    
+    Shares the model and response caches with call_gemini.
+    """
+    return await asyncio.to_thread(
+        functools.partial(call_gemini, api_key, prompt, model=model, use_cache=use_cache)
+    )
+
+
+async def batch_generate(
+    api_key: str,
+    prompts: List[str],
+    model: str = "gemini-2.5-flash",
+    concurrency: int = 8,
+    use_cache: bool = True,
+) -> List[str]:
+    """
+    Send many prompts at once, with at most `concurrency` requests in flight.
+    
+    Uses the SDK's native async call (no worker thread per prompt), so one
+    event loop drives all requests over the SDK's shared connection while
+    the server handles them in parallel. Cached prompts skip the network.
+    
+    Args:
+        api_key: Your Gemini API key
+        prompts: The prompts to send
+        model: Which Gemini model to use
+        concurrency: Maximum number of requests waiting on the API at once
+        use_cache: If True, reuse cached responses for repeated prompts
+        
+    Returns:
+        The response texts, in the same order as prompts
+        
+    Raises:
+        Exception: The first failed call's error (the remaining requests are
+                   cancelled). To retry only the prompts that failed, use
+                   safety.retry_on_failure_batch instead.
+    
+    Example:
+        texts = asyncio.run(batch_generate(api_key, prompts))
+    """
+    llm_model = _get_model(api_key, model)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def generate(prompt: str) -> str:
+        if use_cache:
+            cached = _RESPONSE_CACHE.get(prompt, model)
+            if cached is not None:
+                return cached
+        
+        async with semaphore:
+            response = await llm_model.generate_content_async(prompt)
+        
+        if use_cache:
+            _RESPONSE_CACHE.put(prompt, model, response.text)
+        return response.text
+    
+    start_time = time.time()
+    tasks = [asyncio.ensure_future(generate(prompt)) for prompt in prompts]
+    try:
+        texts = await asyncio.gather(*tasks)
+    except BaseException:
+        # gather() leaves the other requests running after the first
+        # failure; stop them and collect their errors before re-raising
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    latency_ms = (time.time() - start_time) * 1000
+    
+    logger.info(f"Batch of {len(prompts)} calls completed in {latency_ms:.0f}ms")
+    
+    return list(texts)
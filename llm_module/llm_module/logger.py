@@ -1,47 +1,80 @@
 """Simple structured logging."""
 
-from datetime import datetime
-from typing import Any
+import sys
+import time
+from collections import deque
+from typing import Any, List
+
+
+# Level column for each log method, padded once at import time
+_LEVEL_PREFIX = {
+    "info": f"{'ℹ️  INFO':8} | ",
+    "warning": f"{'⚠️  WARN':8} | ",
+    "error": f"{'❌ ERROR':8} | ",
+    "debug": f"{'🔍 DEBUG':8} | ",
+    "success": f"{'✅ OK':8} | ",
+}
 
 
 class Logger:
     """Simple logger for debugging and tracing."""
     
-    def __init__(self, name: str = "LLM", enabled: bool = True):
+    def __init__(self, name: str = "LLM", enabled: bool = True, history: int = 0):
+        """
+        Args:
+            name: Logger name
+            enabled: If False, all log calls are no-ops
+            history: Keep the last N formatted lines in memory (0 = off),
+                     so a trace can be inspected after the run
+        """
         self.name = name
         self.enabled = enabled
+        self.history = deque(maxlen=history) if history > 0 else None
     
     def _format_message(self, level: str, message: str) -> str:
         """Format a log message with timestamp and level."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        return f"[{timestamp}] {level:8} | {message}"
+        timestamp = time.strftime("%H:%M:%S", time.localtime())
+        return f"[{timestamp}] {_LEVEL_PREFIX[level]}{message}\n"
+    
+    def _write(self, level: str, message: str):
+        """Format and emit one line with a single write."""
+        line = self._format_message(level, message)
+        sys.stdout.write(line)
+        if self.history is not None:
+            self.history.append(line)
     
     def info(self, message: str):
         """Log an info message."""
         if self.enabled:
-            print(self._format_message("ℹ️  INFO", message))
+            self._write("info", message)
     
     def warning(self, message: str):
         """Log a warning message."""
         if self.enabled:
-            print(self._format_message("⚠️  WARN", message))
+            self._write("warning", message)
     
     def error(self, message: str):
         """Log an error message."""
         if self.enabled:
-            print(self._format_message("❌ ERROR", message))
+            self._write("error", message)
     
     def debug(self, message: str):
         """Log a debug message."""
         if self.enabled:
-            print(self._format_message("🔍 DEBUG", message))
+            self._write("debug", message)
     
     def success(self, message: str):
         """Log a success message."""
         if self.enabled:
-            print(self._format_message("✅ OK", message))
+            self._write("success", message)
+    
+    def recent(self) -> List[str]:
+        """Return the lines kept in history (oldest first)."""
+        if self.history is None:
+            return []
+        return [line.rstrip("\n") for line in self.history]
 
 
-def get_logger(name: str = "LLM", enabled: bool = True) -> Logger:
+def get_logger(name: str = "LLM", enabled: bool = True, history: int = 0) -> Logger:
     """Get a logger instance."""
-    return Logger(name, enabled)
+    return Logger(name, enabled, history)
@@ -1,15 +1,135 @@
 """Glue code: Put it all together for a simple demo."""
 
+import asyncio
+import logging
+import contextlib
 import os
-from llm_client import call_gemini
+import threading
+from llm_client import call_gemini_streaming, RETRYABLE_ERRORS
 from prompts import format_prompt
 from parser import parse_json, validate_choice, ParseResult
 from safety import retry_on_failure, call_with_retry_and_fallback
 from logger import get_logger
+from console import read_input
+
+try:
+    # Optional: keeps the "You:" prompt usable while answers stream in
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.patch_stdout import patch_stdout
+except ImportError:
+    PromptSession = None
 
 
 logger = get_logger(enabled=True)
 
+# How many questions may wait on the API at the same time
+MAX_IN_FLIGHT = 4
+
+FALLBACK_RESPONSE = "Sorry, I couldn't generate a response."
+
+# Answers are fetched concurrently but printed one at a time: an answer
+# takes the screen with its first chunk and keeps it until it is done
+_screen = threading.Lock()
+
+
+async def read_line(session) -> str:
+    """Read one line of user input without blocking the event loop."""
+    if session is not None:
+        return await session.prompt_async("You: ")
+    return await read_input("You: ")
+
+
+async def handle_message(api_key: str, user_input: str, limit: asyncio.Semaphore):
+    """Answer one question, printing the response as it streams in."""
+    async with limit:
+        # Example 1: Simple Q&A with retry
+        logger.debug(f"User asked: {user_input}")
+        
+        # Format a prompt using templates
+        prompt = format_prompt("qa", question=user_input)
+        logger.debug(f"Formatted prompt: {prompt[:50]}...")
+        
+        # Several answers may be pending, so say which question this answers
+        label = f'LLM ("{user_input[:40]}"): '
+        streamed = []
+        
+        def print_chunk(text: str):
+            if not streamed:
+                _screen.acquire()  # Wait until earlier answers are fully printed
+                print(label, end="", flush=True)
+            streamed.append(text)
+            print(text, end="", flush=True)
+        
+        def is_retryable(error: Exception) -> bool:
+            # Once a chunk is on screen a retry would print the answer again,
+            # so only failures before the first chunk are retried
+            return not streamed and isinstance(error, RETRYABLE_ERRORS)
+        
+        def answer() -> str:
+            # Runs in one worker thread, so the screen lock is taken and
+            # released by the same thread even if the task is cancelled
+            try:
+                response = call_with_retry_and_fallback(
+                    call_gemini_streaming,
+                    args=(api_key, prompt),
+                    kwargs={"on_chunk": print_chunk},
+                    fallback_value=FALLBACK_RESPONSE,
+                    max_attempts=2,
+                    retry_on=(),
+                    is_retryable=is_retryable,
+                )
+                if response == FALLBACK_RESPONSE:
+                    if streamed:
+                        print(f"\n{label}{response}\n")
+                    else:
+                        with _screen:
+                            print(f"{label}{response}\n")
+                else:
+                    print("\n")
+                    logger.success("Got response")
+                return response
+            finally:
+                if streamed:
+                    _screen.release()
+        
+        # Call API with retry and fallback (blocking call runs in a thread)
+        await asyncio.to_thread(answer)
+
+
+async def chat_loop(api_key: str):
+    """
+    Read questions and answer them concurrently.
+    
+    Each question is handled in its own task, so the next one can be
+    typed while the previous answer is still streaming.
+    """
+    session = PromptSession() if PromptSession is not None else None
+    limit = asyncio.Semaphore(MAX_IN_FLIGHT)
+    tasks = set()
+    
+    with patch_stdout() if session is not None else contextlib.nullcontext():
+        while True:
+            try:
+                user_input = (await read_line(session)).strip()
+            except (EOFError, KeyboardInterrupt):
+                user_input = "exit"
+            
+            if user_input.lower() == "exit":
+                break
+            
+            if not user_input:
+                continue
+            
+            task = asyncio.create_task(handle_message(api_key, user_input, limit))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        
+        # Let answers already in progress finish
+        if tasks:
+            await asyncio.gather(*tasks)
+    
+    logger.info("Goodbye!")
+
 
 def main():
     """Demo: Interactive chatbot showing all components."""
@@ -22,38 +142,18 @@ def main():
     
     logger.info("Initializing chatbot...")
     
+    # Show retry/fallback warnings from safety.py
+    logging.basicConfig(level=logging.WARNING, format="   %(levelname)s | %(message)s")
+    
     # Simple interactive loop
     print("\n" + "="*60)
     print("LLM Chatbot Demo - Type 'exit' to quit")
     print("="*60 + "\n")
     
-    while True:
-        user_input = input("You: ").strip()
-        
-        if user_input.lower() == "exit":
-            logger.info("Goodbye!")
-            break
-        
-        if not user_input:
-            continue
-        
-        # Example 1: Simple Q&A with retry
-        logger.debug(f"User asked: {user_input}")
-        
-        # Format a prompt using templates
-        prompt = format_prompt("qa", question=user_input)
-        logger.debug(f"Formatted prompt: {prompt[:50]}...")
-        
-        # Call API with retry and fallback
-        response = call_with_retry_and_fallback(
-            call_gemini,
-            args=(api_key, prompt),
-            fallback_value="Sorry, I couldn't generate a response.",
-            max_attempts=2,
-        )
-        
-        logger.success("Got response")
-        print(f"LLM: {response}\n")
+    try:
+        asyncio.run(chat_loop(api_key))
+    except KeyboardInterrupt:
+        logger.info("Goodbye!")
 
 
 def demo_parsing():
@@ -1,37 +1,237 @@
 """Parse and validate LLM output against expected schemas."""
 
 import json
-import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so the
+# "except json.JSONDecodeError" clauses below cover both
+try:
+    import orjson  # Optional: faster drop-in for json.loads
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+try:
+    import re2 as _re  # Optional: google-re2 guarantees linear-time matching
+except ImportError:
+    import re as _re
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # Optional: the pure-Python scanner is used instead
+    njit = None
+
+
+# Where a JSON object or array may start
+_JSON_START = _re.compile(r"[{\[]")
+
+# Spans shorter than this are scanned in pure Python (JIT call overhead wins)
+_JIT_MIN_LENGTH = 2048
+
+
+# Message for each validation step. Steps are recorded as (key, args)
+# and only formatted when someone reads them, so fast paths that just
+# check result.success never build the strings.
+_STEP_FORMATS = {
+    "empty": "❌ Input is empty",
+    "input_received": "✓ Input received ({} chars)",
+    "direct_ok": "✓ Direct JSON parse succeeded",
+    "direct_failed": "✗ Direct JSON parse failed: {!s:.60}",
+    "extracted": "✓ Extracted JSON from text (found at char {})",
+    "no_structure": "✗ No JSON structure found in text",
+    "extracted_invalid": "✗ Extracted JSON also invalid: {!s:.60}",
+    "not_object": "❌ Expected a JSON object, got {}",
+    "missing_keys": "❌ Missing required keys: {}",
+    "keys_present": "✓ All required keys present: {}",
+    "extra_keys": "❌ Extra keys not allowed: {}",
+    "no_extra_keys": "✓ No extra keys (strict schema enforced)",
+    "json_complete": "✅ JSON validation complete",
+    "choice_input": "✓ Input received: '{}'",
+    "choice_matched": "✓ Matched choice: '{}'",
+    "choice_invalid": "❌ Not in allowed choices: {}",
+    "length": "✓ Text length: {} chars",
+    "too_short": "❌ Too short: {} < {}",
+    "too_long": "❌ Too long: {} > {}",
+    "length_ok": "✓ Length within bounds",
+}
 
 
 class ParseResult:
     """Result of parsing output with full traceability."""
     
+    # One is created per validation; slots skip the per-instance __dict__
+    __slots__ = ("success", "data", "error", "raw_text", "_steps")
+    
     def __init__(
         self,
         success: bool,
         data: Any = None,
         error: str = None,
         raw_text: str = "",
-        validation_steps: List[str] = None,
+        validation_steps: List[Union[str, Tuple[str, tuple]]] = None,
     ):
         self.success = success
         self.data = data
         self.error = error
         self.raw_text = raw_text
-        self.validation_steps = validation_steps or []
+        self._steps = validation_steps or []
+    
+    @property
+    def validation_steps(self) -> List[str]:
+        """The validation trace as readable strings (built on access)."""
+        return self.steps_str()
+    
+    @validation_steps.setter
+    def validation_steps(self, steps: List[Union[str, Tuple[str, tuple]]]):
+        self._steps = steps
+    
+    def steps_str(self) -> List[str]:
+        """
+        Format the recorded steps into readable strings.
+        
+        Steps are either plain strings or (key, args) tuples looked up
+        in _STEP_FORMATS.
+        """
+        return [
+            step if isinstance(step, str) else _STEP_FORMATS[step[0]].format(*step[1])
+            for step in self._steps
+        ]
         
     def __repr__(self):
         if self.success:
-            return f"ParseResult(success=True, data={self.data}, steps={len(self.validation_steps)})"
+            return f"ParseResult(success=True, data={self.data}, steps={len(self._steps)})"
         else:
             return f"ParseResult(success=False, error={self.error}, steps={self.validation_steps})"
 
 
+def _collect_spans(text: str, begin: int) -> List[Tuple[int, int]]:
+    """
+    Return every balanced span in text[begin:], found in one pass.
+    
+    Open brackets go on a stack; each closing bracket pops its opener
+    and records that span. String literals are only tracked inside an
+    open span, so quotes in the surrounding prose don't hide brackets.
+    Openers that never close simply stay on the stack.
+    """
+    spans = []
+    stack = []
+    in_string = False
+    escaped = False
+    for i in range(begin, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = bool(stack)
+        elif ch == "{" or ch == "[":
+            stack.append(i)
+        elif (ch == "}" or ch == "]") and stack:
+            spans.append((stack.pop(), i + 1))
+    return spans
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _collect_spans_jit(codes, begin):
+        """Compiled _collect_spans over an array of code points."""
+        n = codes.shape[0]
+        stack = np.empty(n, dtype=np.int64)
+        starts = np.empty(n, dtype=np.int64)
+        ends = np.empty(n, dtype=np.int64)
+        top = 0
+        count = 0
+        in_string = False
+        escaped = False
+        for i in range(begin, n):
+            c = codes[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == 0x5C:  # backslash
+                    escaped = True
+                elif c == 0x22:  # "
+                    in_string = False
+            elif c == 0x22:
+                in_string = top > 0
+            elif c == 0x7B or c == 0x5B:  # { [
+                stack[top] = i
+                top += 1
+            elif (c == 0x7D or c == 0x5D) and top > 0:  # } ]
+                top -= 1
+                starts[count] = stack[top]
+                ends[count] = i + 1
+                count += 1
+        return starts[:count], ends[:count]
+
+
+def _iter_json_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Yield every balanced span in text, in order of its opening bracket.
+    
+    A bracket in surrounding prose may start a span that isn't JSON (or
+    never closes), so callers try each candidate until one parses. All
+    spans come from a single linear pass, and long texts are encoded for
+    the JIT scanner only once.
+    """
+    match = _JSON_START.search(text)
+    if match is None:
+        return
+    begin = match.start()
+    if njit is not None and len(text) - begin >= _JIT_MIN_LENGTH:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        starts, ends = _collect_spans_jit(codes, begin)
+        spans = list(zip(starts.tolist(), ends.tolist()))
+    else:
+        spans = _collect_spans(text, begin)
+    # Spans close inner-first; try them outermost-first, as they open
+    spans.sort()
+    yield from spans
+
+
+def json_complete(text: str, required_keys: Optional[Sequence[str]] = None) -> bool:
+    """
+    Check whether text already contains a complete JSON object.
+    
+    Meant for streaming: pass it as early_terminate_fn to
+    call_gemini_streaming to stop reading once the JSON has arrived.
+    Like parse_json, it skips spans that aren't objects, so a "[1]"
+    citation before the JSON doesn't end the stream early.
+    
+    Args:
+        text: The response text received so far
+        required_keys: If given, the object must have all of these keys
+                       (pass the same schema as to parse_json, so a
+                       nested object that closes first doesn't count)
+        
+    Example:
+        keys = TEMPLATE_SCHEMAS["structured_info"]
+        response = call_gemini_streaming(
+            api_key, prompt,
+            early_terminate_fn=partial(json_complete, required_keys=keys),
+        )
+    """
+    for start, end in _iter_json_spans(text):
+        try:
+            candidate = _loads(text[start:end])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(candidate, dict) and (
+            not required_keys or all(key in candidate for key in required_keys)
+        ):
+            return True
+    return False
+
+
 def parse_json(
     text: str,
-    required_keys: Optional[List[str]] = None,
+    required_keys: Optional[Sequence[str]] = None,
     allow_extra_keys: bool = False,
 ) -> ParseResult:
     """
@@ -39,7 +239,8 @@ def parse_json(
     
     Args:
         text: Text that should contain JSON
-        required_keys: List of keys that MUST be in the JSON (e.g., ["name", "age"])
+        required_keys: Keys that MUST be in the JSON (e.g., ["name", "age"],
+                       or a schema from prompts.TEMPLATE_SCHEMAS)
         allow_extra_keys: If False, fail if JSON has keys not in required_keys
         
     Returns:
@@ -58,46 +259,72 @@ def parse_json(
     
     # Step 1: Check if input is empty
     if not text or not text.strip():
-        steps.append("❌ Input is empty")
+        steps.append(("empty", ()))
         return ParseResult(success=False, error="Empty response", validation_steps=steps)
     
-    steps.append(f"✓ Input received ({len(text)} chars)")
+    steps.append(("input_received", (len(text),)))
     
     # Step 2: Try direct JSON parsing
     try:
-        data = json.loads(text)
-        steps.append("✓ Direct JSON parse succeeded")
+        data = _loads(text)
+        steps.append(("direct_ok", ()))
     except json.JSONDecodeError as e:
-        steps.append(f"✗ Direct JSON parse failed: {str(e)[:60]}")
+        steps.append(("direct_failed", (e,)))
         
         # Step 3: Try to extract JSON from surrounding text
-        json_match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
-        if json_match:
+        found_span = False
+        non_object = None
+        for start, end in _iter_json_spans(text):
+            found_span = True
             try:
-                data = json.loads(json_match.group())
-                steps.append(f"✓ Extracted JSON from text (found at char {json_match.start()})")
+                candidate = _loads(text[start:end])
             except json.JSONDecodeError as e2:
-                steps.append(f"✗ Extracted JSON also invalid: {str(e2)[:60]}")
+                last_error = e2
+                continue
+            # A schema needs an object, so skip e.g. a "[1]" citation in prose
+            if required_keys and not isinstance(candidate, dict):
+                if non_object is None:
+                    non_object = (start, candidate)
+                continue
+            data = candidate
+            steps.append(("extracted", (start,)))
+            break
+        else:
+            if non_object is not None:
+                # Only non-objects parsed; step 4 reports the schema violation
+                start, data = non_object
+                steps.append(("extracted", (start,)))
+            elif not found_span:
+                steps.append(("no_structure", ()))
+                return ParseResult(
+                    success=False,
+                    error="No JSON structure found",
+                    raw_text=text,
+                    validation_steps=steps,
+                )
+            else:
+                steps.append(("extracted_invalid", (last_error,)))
                 return ParseResult(
                     success=False,
                     error=f"No valid JSON found: {str(e)}",
                     raw_text=text,
                     validation_steps=steps,
                 )
-        else:
-            steps.append("✗ No JSON structure found in text")
+    
+    # Step 4: Validate schema (required keys)
+    if required_keys:
+        if not isinstance(data, dict):
+            steps.append(("not_object", (type(data).__name__,)))
             return ParseResult(
                 success=False,
-                error="No JSON structure found",
+                error="Schema violation: expected a JSON object",
+                data=data,
                 raw_text=text,
                 validation_steps=steps,
             )
-    
-    # Step 4: Validate schema (required keys)
-    if required_keys:
         missing_keys = [k for k in required_keys if k not in data]
         if missing_keys:
-            steps.append(f"❌ Missing required keys: {missing_keys}")
+            steps.append(("missing_keys", (missing_keys,)))
             return ParseResult(
                 success=False,
                 error=f"Schema violation: missing keys {missing_keys}",
@@ -105,13 +332,14 @@ def parse_json(
                 raw_text=text,
                 validation_steps=steps,
             )
-        steps.append(f"✓ All required keys present: {required_keys}")
+        steps.append(("keys_present", (required_keys,)))
         
         # Step 5: Check for extra keys (if strict)
         if not allow_extra_keys:
-            extra_keys = [k for k in data.keys() if k not in required_keys]
+            required_set = frozenset(required_keys)
+            extra_keys = [k for k in data if k not in required_set]
             if extra_keys:
-                steps.append(f"❌ Extra keys not allowed: {extra_keys}")
+                steps.append(("extra_keys", (extra_keys,)))
                 return ParseResult(
                     success=False,
                     error=f"Schema violation: unexpected keys {extra_keys}",
@@ -119,12 +347,67 @@ def parse_json(
                     raw_text=text,
                     validation_steps=steps,
                 )
-            steps.append(f"✓ No extra keys (strict schema enforced)")
+            steps.append(("no_extra_keys", ()))
     
-    steps.append("✅ JSON validation complete")
+    steps.append(("json_complete", ()))
     return ParseResult(success=True, data=data, raw_text=text, validation_steps=steps)
 
 
+def parse_json_batch(
+    texts: List[str],
+    required_keys: Optional[Sequence[str]] = None,
+    allow_extra_keys: bool = False,
+) -> List[ParseResult]:
+    """
+    Parse many responses against the same schema.
+    
+    The schema is prepared once for the whole batch, and responses that
+    are clean JSON objects matching it take a fused fast path (one decode,
+    one key check). Anything else goes through parse_json for the full
+    validation trace, so results are the same as calling parse_json on
+    each text.
+    
+    Args:
+        texts: Responses that should each contain JSON
+        required_keys: Keys every JSON object MUST have
+        allow_extra_keys: If False, fail if JSON has keys not in required_keys
+        
+    Returns:
+        One ParseResult per text, in the same order
+    """
+    req_tuple = tuple(required_keys) if required_keys else ()
+    req_set = frozenset(req_tuple)
+    
+    # Trace shared by every fast-path success (after the per-text length step)
+    tail = [("direct_ok", ())]
+    if req_tuple:
+        tail.append(("keys_present", (required_keys,)))
+        if not allow_extra_keys:
+            tail.append(("no_extra_keys", ()))
+    tail.append(("json_complete", ()))
+    
+    results = []
+    for text in texts:
+        try:
+            data = _loads(text) if text else None
+        except json.JSONDecodeError:
+            data = None
+        
+        if (
+            isinstance(data, dict)
+            and (not req_tuple or (
+                all(k in data for k in req_tuple)
+                and (allow_extra_keys or req_set.issuperset(data))
+            ))
+        ):
+            steps = [("input_received", (len(text),))]
+            steps.extend(tail)
+            results.append(ParseResult(success=True, data=data, raw_text=text, validation_steps=steps))
+        else:
+            results.append(parse_json(text, required_keys, allow_extra_keys))
+    return results
+
+
 def validate_choice(text: str, valid_choices: List[str]) -> ParseResult:
     """
     Check if text matches one of the valid choices (case-insensitive).
@@ -139,14 +422,14 @@ def validate_choice(text: str, valid_choices: List[str]) -> ParseResult:
     steps = []
     
     if not text or not text.strip():
-        steps.append("❌ Input is empty")
+        steps.append(("empty", ()))
         return ParseResult(
             success=False,
             error="Empty response",
             validation_steps=steps,
         )
     
-    steps.append(f"✓ Input received: '{text}'")
+    steps.append(("choice_input", (text,)))
     
     # Normalize: lowercase and strip whitespace
     normalized = text.strip().lower()
@@ -156,7 +439,7 @@ def validate_choice(text: str, valid_choices: List[str]) -> ParseResult:
         # Return the original choice (not lowercased)
         idx = valid_normalized.index(normalized)
         original_choice = valid_choices[idx]
-        steps.append(f"✓ Matched choice: '{original_choice}'")
+        steps.append(("choice_matched", (original_choice,)))
         return ParseResult(
             success=True,
             data=original_choice,
@@ -164,7 +447,7 @@ def validate_choice(text: str, valid_choices: List[str]) -> ParseResult:
             validation_steps=steps,
         )
     
-    steps.append(f"❌ Not in allowed choices: {valid_choices}")
+    steps.append(("choice_invalid", (valid_choices,)))
     return ParseResult(
         success=False,
         error=f"'{text}' is not one of: {valid_choices}",
@@ -191,10 +474,10 @@ def validate_length(
     """
     steps = []
     length = len(text)
-    steps.append(f"✓ Text length: {length} chars")
+    steps.append(("length", (length,)))
     
     if min_length > 0 and length < min_length:
-        steps.append(f"❌ Too short: {length} < {min_length}")
+        steps.append(("too_short", (length, min_length)))
         return ParseResult(
             success=False,
             error=f"Text too short: {length} < {min_length}",
@@ -203,7 +486,7 @@ def validate_length(
         )
     
     if max_length and length > max_length:
-        steps.append(f"❌ Too long: {length} > {max_length}")
+        steps.append(("too_long", (length, max_length)))
         return ParseResult(
             success=False,
             error=f"Text too long: {length} > {max_length}",
@@ -211,5 +494,5 @@ def validate_length(
             validation_steps=steps,
         )
     
-    steps.append(f"✓ Length within bounds")
+    steps.append(("length_ok", ()))
     return ParseResult(success=True, data=text, raw_text=text, validation_steps=steps)
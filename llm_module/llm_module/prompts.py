@@ -1,7 +1,12 @@
 """Prompt templates with explicit output format requirements."""
 
+from string import Formatter
+from typing import Callable, Dict, List, Tuple
 
-# System instruction - what the AI should be like
+
+# System instruction - what the AI should be like.
+# Sent once through the model's system_instruction slot (see llm_client.py),
+# so templates below only carry task-specific instructions.
 SYSTEM_INSTRUCTION = """You are a helpful, clear, and concise assistant.
 Answer questions directly without unnecessary explanation.
 If unsure, say so.
@@ -10,40 +15,97 @@ ALWAYS follow the output format specified in the prompt."""
 
 # Reusable prompt templates with EXPLICIT output format requirements
 # Each template includes format instructions and examples
+#
+# Static instructions come FIRST and variable slots LAST: every call to a
+# template then shares the same literal prefix, which is what provider-side
+# prompt caching keys on. Keep it that way when editing templates.
 TEMPLATES = {
-    "qa": """Question: {question}
+    "qa": """Answer the question below clearly and completely. Use as many lines as needed.
 
-Answer this question clearly and completely. Use as many lines as needed, but only explain what's necessary for understanding.""",
+Question: {question}""",
     
-    "json_extract": """Extract the key information from the text below and return ONLY a valid JSON object.
-Do not include any text before or after the JSON.
-The JSON must have exactly these keys: {required_keys}
+    "json_extract": """Extract the key information from the text below.
+Return ONLY a valid JSON object (no markdown, no text before or after it).
 
-Text: {text}
+The JSON must have exactly these keys: {required_keys}
 
-Return ONLY valid JSON (no markdown, no explanation):""",
+Text: {text}""",
     
-    "classify": """Classify the text below as exactly one of: {categories}
+    "classify": """Classify the text below as exactly one of the categories listed.
+Return ONLY the classification word, nothing else.
 
-Text: {text}
+Categories: {categories}
 
-Return ONLY the classification word, nothing else. No explanation.""",
+Text: {text}""",
     
     "sentiment": """Analyze the sentiment of the text below.
 Return the sentiment and a brief explanation only if it's not obvious.
 
-Text: {text}
-
-Analysis:""",
+Text: {text}""",
     
     "structured_info": """Extract information about a person from the text below.
 Return ONLY a valid JSON object with exactly these fields: name, age, location
 If any field is unknown, use "unknown" as the value.
 Do not include any text before or after the JSON.
 
-Text: {text}
+Text: {text}""",
+    
+    # Batch version of "structured_info": one call for many texts.
+    # Fill with format_prompt_batch(), which numbers each input block.
+    "structured_info_batch": """Extract information about a person from EACH numbered text below.
+Return ONLY a valid JSON array with one object per text, in the same order
+(element 1 is for Text 1, element 2 is for Text 2, and so on).
+Each object must have exactly these fields: name, age, location
+If any field is unknown, use "unknown" as the value.
+Do not include any text before or after the JSON array.
 
-Return ONLY valid JSON:""",
+{items}""",
+}
+
+
+# Keys each JSON-returning template asks for, in the order it lists them.
+# Pass as parse_json(response, required_keys=TEMPLATE_SCHEMAS[name]).
+TEMPLATE_SCHEMAS: Dict[str, Tuple[str, ...]] = {
+    "structured_info": ("name", "age", "location"),
+    "structured_info_batch": ("name", "age", "location"),
+}
+
+
+def _compile_template(template: str) -> Callable[..., str]:
+    """
+    Turn a template into a specialized render function.
+    
+    str.format re-parses the template on every call. Instead, parse it
+    once and generate a function that only concatenates, e.g.:
+    
+        "Text: {text}"  ->  def render(**kw): return _L0 + str(kw['text'])
+    
+    Same output as str.format (missing variables raise KeyError, extra
+    ones are ignored). Templates using format specs, conversions or
+    indexing (e.g. {x:>8}, {x!r}, {x[0]}) just use str.format.
+    """
+    namespace = {}
+    pieces = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return template.format
+        if literal:
+            name = f"_L{len(namespace)}"
+            namespace[name] = literal
+            pieces.append(name)
+        if field is not None:
+            pieces.append(f"str(kw[{field!r}])")
+    
+    source = f"def render(**kw):\n    return {' + '.join(pieces) or repr('')}\n"
+    exec(source, namespace)
+    return namespace["render"]
+
+
+# Template name -> (template text it was compiled from, renderer).
+# The text is kept so edits to TEMPLATES at runtime are picked up.
+_COMPILED: Dict[str, Tuple[str, Callable[..., str]]] = {
+    name: (template, _compile_template(template))
+    for name, template in TEMPLATES.items()
 }
 
 
@@ -78,4 +140,34 @@ def format_prompt(template_name: str, **kwargs) -> str:
         # Application doesn't need to change if we update TEMPLATES["qa"]
     """
     template = get_template(template_name)
-    return template.format(**kwargs)
+    compiled = _COMPILED.get(template_name)
+    if compiled is None or compiled[0] is not template:
+        compiled = _COMPILED[template_name] = (template, _compile_template(template))
+    return compiled[1](**kwargs)
+
+
+def format_prompt_batch(template_name: str, items: List[Dict[str, str]]) -> str:
+    """
+    Format a batch template with several inputs in one prompt.
+    
+    Each item becomes a numbered block (e.g., "Text 1: ...") so the model
+    can answer all of them in a single call, instead of one call per item.
+    
+    Args:
+        template_name: Name of a batch template (must have an {items} slot)
+        items: One dict of variables per input, e.g. [{"text": "..."}, ...]
+        
+    Returns:
+        The formatted prompt string
+        
+    Example:
+        prompt = format_prompt_batch(
+            "structured_info_batch",
+            [{"text": "Alice, 28, NYC"}, {"text": "Bob, 40, LA"}],
+        )
+    """
+    blocks = []
+    for number, item in enumerate(items, start=1):
+        for key, value in item.items():
+            blocks.append(f"{key.capitalize()} {number}: {value}")
+    return format_prompt(template_name, items="\n".join(blocks))
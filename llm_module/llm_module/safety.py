@@ -1,20 +1,270 @@
 """Retry logic and failure handling."""
 
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import threading
 import time
-from typing import Callable, Any, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Any, Iterable, Iterator, List, Optional, Tuple, Type
+
+# Retry/fallback events go through logging, so formatting is skipped when
+# the level is disabled. Silence with:
+#     logging.getLogger("safety").setLevel(logging.ERROR)
+# ("llm_module.safety" when imported through the package)
+log = logging.getLogger(__name__)
+
+# Until when (time.monotonic) a recent rate-limit response asked us to back
+# off. Shared by all callers, so nobody spends a round trip on a call that
+# would just get another 429.
+_cooldown_until: float = 0.0
+
+
+def should_wait() -> float:
+    """Return how many seconds remain in the current rate-limit cooldown (0 if none)."""
+    return max(0.0, _cooldown_until - time.monotonic())
+
+
+# HTTP statuses that mean "try again later": rate limit, server errors,
+# overload and gateway timeouts
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    True for errors that carry a transient HTTP status code.
+    
+    The default is_retryable check. google.api_core errors are not
+    TimeoutError or ConnectionError subclasses, but they do carry a code
+    (e.g. ResourceExhausted is 429 and ServiceUnavailable is 503). So
+    Gemini rate limits and overloads are retried even when the caller
+    doesn't pass retry_on=RETRYABLE_ERRORS.
+    """
+    return getattr(error, "code", None) in TRANSIENT_STATUS_CODES
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    """True for HTTP 429 errors (e.g. google.api_core ResourceExhausted)."""
+    return getattr(error, "code", None) == 429
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the error's Retry-After header, if it has one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _start_cooldown(seconds: float):
+    """Hold off all calls for the next `seconds` seconds."""
+    global _cooldown_until
+    _cooldown_until = max(_cooldown_until, time.monotonic() + seconds)
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """
+    Default retry settings for every retry helper in the current context.
+    
+    Any setting a caller leaves as None is read from the active policy,
+    so code making many calls sets it once instead of passing it each time.
+    
+    Example:
+        with with_policy(RetryPolicy(max_attempts=5, max_delay=10.0)):
+            run_experiments()
+    """
+    max_attempts: int = 3
+    delay: float = 1.0
+    backoff: float = 2.0
+    max_delay: float = 30.0
+    jitter: float = 1.0
+    
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {self.max_attempts}")
+
+
+_policy: ContextVar[RetryPolicy] = ContextVar("retry_policy", default=RetryPolicy())
+
+
+@contextmanager
+def with_policy(policy: RetryPolicy) -> Iterator[RetryPolicy]:
+    """Make `policy` the default for retries inside the with block (task-local)."""
+    token = _policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _policy.reset(token)
+
+
+def _settings(
+    max_attempts: Optional[int],
+    delay: Optional[float],
+    backoff: Optional[float],
+    max_delay: Optional[float],
+    jitter: Optional[float],
+) -> Tuple[int, float, float, float, float]:
+    """Fill in unset (None) retry settings from the current RetryPolicy."""
+    policy = _policy.get()
+    max_attempts = policy.max_attempts if max_attempts is None else max_attempts
+    if max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+    return (
+        max_attempts,
+        policy.delay if delay is None else delay,
+        policy.backoff if backoff is None else backoff,
+        policy.max_delay if max_delay is None else max_delay,
+        policy.jitter if jitter is None else jitter,
+    )
+
+
+def _bind(func: Callable, args: tuple, kwargs: Optional[dict]) -> Callable:
+    """Bind arguments once, so each attempt is a plain zero-argument call."""
+    if not args and not kwargs:
+        return func
+    return functools.partial(func, *args, **(kwargs or {}))
+
+
+@functools.lru_cache(maxsize=64)
+def _backoff_schedule(
+    delay: float, backoff: float, max_delay: float, max_attempts: int
+) -> Tuple[float, ...]:
+    """
+    Capped backoff delays; entry i is the wait after failed attempt i + 1.
+    
+    The last entry is never slept on; it is the cooldown a 429 on the
+    final attempt starts for other callers (if it has no Retry-After).
+    """
+    return tuple(min(max_delay, delay * (backoff ** i)) for i in range(max_attempts))
+
+
+@dataclass(slots=True)
+class RetryResult:
+    """
+    Outcome of a retried call.
+    
+    Check ok, not value: a successful call may legitimately return None.
+    
+    Example:
+        r = retry_on_failure(api_call, args=(prompt,))
+        text = r.value if r.ok else "(unavailable)"
+    """
+    value: Any = None
+    error: Optional[BaseException] = None  # Last error if not ok (None if cancelled first)
+    attempts: int = 0
+    ok: bool = False
+
+
+def _retry_core(
+    call: Callable,
+    max_attempts: Optional[int],
+    delay: Optional[float],
+    backoff: Optional[float],
+    max_delay: Optional[float],
+    jitter: Optional[float],
+    retry_on: Tuple[Type[BaseException], ...],
+    is_retryable: Optional[Callable[[Exception], bool]],
+    cancel_event: Optional[threading.Event],
+    reraise: bool = True,
+) -> RetryResult:
+    """
+    The retry loop shared by retry_on_failure and call_with_retry_and_fallback.
+    
+    Every outcome is a RetryResult. Non-retryable errors are re-raised
+    when reraise is True, otherwise returned as a failed result. Settings
+    passed as None come from the current RetryPolicy.
+    """
+    max_attempts, delay, backoff, max_delay, jitter = _settings(
+        max_attempts, delay, backoff, max_delay, jitter
+    )
+    
+    # Waits use Event.wait (not time.sleep) so a cancel ends them at once
+    evt = cancel_event or threading.Event()
+    last_error = None
+    
+    schedule = _backoff_schedule(delay, backoff, max_delay, max_attempts)
+    
+    for attempt in range(1, max_attempts + 1):
+        # Honor a rate-limit cooldown instead of spending a call on a 429
+        wait = should_wait()
+        if wait > 0:
+            log.info("Rate limited, waiting %.2fs before calling...", wait)
+            evt.wait(wait)
+        
+        if evt.is_set():
+            log.warning("Retry cancelled")
+            return RetryResult(error=last_error, attempts=attempt - 1)
+        
+        try:
+            # Try to call the function
+            return RetryResult(call(), attempts=attempt, ok=True)
+        except Exception as e:
+            last_error = e
+            
+            # Exponential backoff with jitter
+            backoff_delay = schedule[attempt - 1]
+            current_delay = random.uniform(backoff_delay * (1 - jitter), backoff_delay)
+            
+            # Rate limited: the server's Retry-After (or our backoff) applies
+            # to every caller, even if this one gives up below, so the wait
+            # happens in the cooldown check above
+            rate_limited = _is_rate_limit(e)
+            if rate_limited:
+                retry_after = _retry_after(e)
+                _start_cooldown(retry_after if retry_after is not None else current_delay)
+            
+            # Permanent errors: retrying only wastes time
+            if not isinstance(e, retry_on) and not (is_retryable and is_retryable(e)):
+                log.error("Not retrying %s: %s", type(e).__name__, e)
+                if reraise:
+                    raise
+                return RetryResult(error=e, attempts=attempt)
+            
+            # If this was the last attempt, stop trying
+            if attempt == max_attempts:
+                log.error("Failed after %d attempts. Last error: %s", max_attempts, e)
+                return RetryResult(error=e, attempts=attempt)
+            
+            # Otherwise, wait and retry
+            log.warning("Attempt %d failed: %s", attempt, e)
+            if rate_limited:
+                continue
+            
+            log.info("Retrying in %.2fs...", current_delay)
+            evt.wait(current_delay)
+    
+    return RetryResult(error=last_error, attempts=max_attempts)
 
 
 def retry_on_failure(
     func: Callable,
     args: tuple = (),
     kwargs: dict = None,
-    max_attempts: int = 3,
-    delay: float = 1.0,
-    backoff: float = 2.0,
-) -> Optional[Any]:
+    max_attempts: Optional[int] = None,
+    delay: Optional[float] = None,
+    backoff: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    jitter: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (TimeoutError, ConnectionError),
+    is_retryable: Optional[Callable[[Exception], bool]] = is_transient,
+    cancel_event: Optional[threading.Event] = None,
+) -> RetryResult:
     """
     Retry a function call if it fails.
     
+    max_attempts, delay, backoff, max_delay and jitter default to None,
+    meaning "use the current RetryPolicy" (3, 1.0, 2.0, 30.0 and 1.0
+    unless changed with with_policy).
+    
     Args:
         func: The function to call
         args: Positional arguments to pass
@@ -22,36 +272,247 @@ def retry_on_failure(
         max_attempts: How many times to try
         delay: Wait this many seconds between attempts
         backoff: Multiply delay by this after each failure
+        max_delay: Never wait longer than this many seconds
+        jitter: Fraction of each wait that is randomized (0 = fixed waits,
+                1 = "full jitter", a random wait between 0 and the backoff
+                delay). Spreads out retries from many callers hitting the
+                same rate limit, instead of retrying in lockstep.
+        retry_on: Exception types worth retrying (transient failures).
+                  Anything else (bad API key, invalid request, ...) won't
+                  succeed on a second try, so it is re-raised immediately.
+                  For Gemini calls use llm_client.RETRYABLE_ERRORS.
+        is_retryable: Extra check; errors it returns True for are retried
+                      even if not in retry_on. Defaults to is_transient
+                      (HTTP 429/500/502/503/504); pass None to retry only
+                      retry_on
+        cancel_event: Set this event (e.g. from a SIGINT handler) to stop
+                      retrying; waits between attempts end immediately
         
     Returns:
-        The function's result if successful, or None if all attempts fail
+        A RetryResult: ok and value if a call succeeded, otherwise the last
+        error and how many attempts were made (fewer if cancelled)
+        
+    Raises:
+        The original exception if it is not retryable
         
     Example:
         result = retry_on_failure(api_call, args=(prompt,), max_attempts=3)
+        if result.ok:
+            print(result.value)
     """
-    if kwargs is None:
-        kwargs = {}
+    return _retry_core(
+        _bind(func, args, kwargs),
+        max_attempts, delay, backoff, max_delay, jitter,
+        retry_on, is_retryable, cancel_event,
+    )
+
+
+async def _retry_core_async(
+    make_coro: Callable,
+    max_attempts: Optional[int],
+    delay: Optional[float],
+    backoff: Optional[float],
+    max_delay: Optional[float],
+    jitter: Optional[float],
+    retry_on: Tuple[Type[BaseException], ...],
+    is_retryable: Optional[Callable[[Exception], bool]],
+    reraise: bool = True,
+) -> RetryResult:
+    """Async counterpart of _retry_core: awaits make_coro() on each attempt."""
+    max_attempts, delay, backoff, max_delay, jitter = _settings(
+        max_attempts, delay, backoff, max_delay, jitter
+    )
     
-    current_delay = delay
+    schedule = _backoff_schedule(delay, backoff, max_delay, max_attempts)
     last_error = None
     
     for attempt in range(1, max_attempts + 1):
+        # Honor a rate-limit cooldown instead of spending a call on a 429
+        wait = should_wait()
+        if wait > 0:
+            log.info("Rate limited, waiting %.2fs before calling...", wait)
+            await asyncio.sleep(wait)
+        
         try:
-            # Try to call the function
-            return func(*args, **kwargs)
+            return RetryResult(await make_coro(), attempts=attempt, ok=True)
         except Exception as e:
             last_error = e
             
-            # If this was the last attempt, stop trying
+            backoff_delay = schedule[attempt - 1]
+            current_delay = random.uniform(backoff_delay * (1 - jitter), backoff_delay)
+            
+            rate_limited = _is_rate_limit(e)
+            if rate_limited:
+                retry_after = _retry_after(e)
+                _start_cooldown(retry_after if retry_after is not None else current_delay)
+            
+            # Permanent errors: retrying only wastes time
+            if not isinstance(e, retry_on) and not (is_retryable and is_retryable(e)):
+                log.error("Not retrying %s: %s", type(e).__name__, e)
+                if reraise:
+                    raise
+                return RetryResult(error=e, attempts=attempt)
+            
             if attempt == max_attempts:
-                print(f"❌ Failed after {max_attempts} attempts. Last error: {e}")
-                return None
+                log.error("Failed after %d attempts. Last error: %s", max_attempts, e)
+                return RetryResult(error=e, attempts=attempt)
             
-            # Otherwise, wait and retry
-            print(f"⚠️  Attempt {attempt} failed: {e}")
-            print(f"   Retrying in {current_delay}s...")
-            time.sleep(current_delay)
-            current_delay *= backoff
+            log.warning("Attempt %d failed: %s", attempt, e)
+            if rate_limited:
+                continue
+            
+            log.info("Retrying in %.2fs...", current_delay)
+            await asyncio.sleep(current_delay)
+    
+    return RetryResult(error=last_error, attempts=max_attempts)
+
+
+async def retry_on_failure_async(
+    coro_factory: Callable,
+    args: tuple = (),
+    kwargs: dict = None,
+    max_attempts: Optional[int] = None,
+    delay: Optional[float] = None,
+    backoff: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    jitter: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (TimeoutError, ConnectionError),
+    is_retryable: Optional[Callable[[Exception], bool]] = is_transient,
+) -> RetryResult:
+    """
+    Async version of retry_on_failure.
+    
+    Waits with asyncio.sleep, so other tasks keep running during backoff,
+    and many calls can be retried concurrently:
+    
+        results = await asyncio.gather(*[
+            retry_on_failure_async(model.generate_content_async, args=(p,))
+            for p in prompts
+        ])
+    
+    Cancel the task to stop retrying.
+    
+    Args:
+        coro_factory: Async function to call; each attempt awaits a
+                      fresh coroutine coro_factory(*args, **kwargs)
+        (other arguments as in retry_on_failure)
+        
+    Returns:
+        A RetryResult, as for retry_on_failure
+        
+    Raises:
+        The original exception if it is not retryable
+    """
+    return await _retry_core_async(
+        _bind(coro_factory, args, kwargs),
+        max_attempts, delay, backoff, max_delay, jitter,
+        retry_on, is_retryable,
+    )
+
+
+async def retry_on_failure_batch(
+    coro_factory: Callable,
+    inputs: Iterable,
+    concurrency: int = 8,
+    max_attempts: Optional[int] = None,
+    delay: Optional[float] = None,
+    backoff: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    jitter: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (TimeoutError, ConnectionError),
+    is_retryable: Optional[Callable[[Exception], bool]] = is_transient,
+) -> List[RetryResult]:
+    """
+    Run coro_factory(x) for every input concurrently, retrying only the failures.
+    
+    Each round sends every input still pending (at most `concurrency` at
+    a time), keeps the successes, and after one shared backoff wait sends
+    just the retryable failures again. One slow or rate-limited input
+    doesn't hold up, or re-send, the rest of the batch.
+    
+    Args:
+        coro_factory: Async function of one input, e.g.
+                      lambda p: call_gemini_async(api_key, p)
+        inputs: The inputs to process
+        concurrency: Maximum number of calls in flight at once
+        (other arguments as in retry_on_failure)
+        
+    Returns:
+        One RetryResult per input, in order. Inputs that still failed
+        after max_attempts, or failed with a non-retryable error, are
+        not ok and carry their last error (which is also logged).
+        
+    Example:
+        results = await retry_on_failure_batch(
+            lambda p: call_gemini_async(api_key, p),
+            prompts,
+            retry_on=RETRYABLE_ERRORS,
+        )
+        texts = [r.value if r.ok else None for r in results]
+    """
+    max_attempts, delay, backoff, max_delay, jitter = _settings(
+        max_attempts, delay, backoff, max_delay, jitter
+    )
+    inputs = list(inputs)
+    results = [RetryResult() for _ in inputs]
+    pending = list(range(len(inputs)))
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(i):
+        async with semaphore:
+            return await coro_factory(inputs[i])
+    
+    schedule = _backoff_schedule(delay, backoff, max_delay, max_attempts)
+    
+    for attempt in range(1, max_attempts + 1):
+        # Honor a rate-limit cooldown instead of spending calls on a 429
+        wait = should_wait()
+        if wait > 0:
+            log.info("Rate limited, waiting %.2fs before calling...", wait)
+            await asyncio.sleep(wait)
+        
+        outcomes = await asyncio.gather(*(run(i) for i in pending), return_exceptions=True)
+        
+        failed = []
+        rate_limited = None
+        for i, outcome in zip(pending, outcomes):
+            if not isinstance(outcome, BaseException):
+                results[i] = RetryResult(outcome, attempts=attempt, ok=True)
+                continue
+            if not isinstance(outcome, Exception):
+                raise outcome  # Cancellation etc. is not a failed call
+            
+            results[i] = RetryResult(error=outcome, attempts=attempt)
+            if _is_rate_limit(outcome):
+                rate_limited = outcome
+            if not isinstance(outcome, retry_on) and not (is_retryable and is_retryable(outcome)):
+                log.error("Not retrying input %d, %s: %s", i, type(outcome).__name__, outcome)
+            elif attempt == max_attempts:
+                log.error("Input %d failed after %d attempts. Last error: %s", i, max_attempts, outcome)
+            else:
+                failed.append(i)
+        
+        # One backoff wait per round, shared by all the failed inputs
+        backoff_delay = schedule[attempt - 1]
+        current_delay = random.uniform(backoff_delay * (1 - jitter), backoff_delay)
+        
+        # A 429 starts the shared cooldown even if no input is retried
+        if rate_limited is not None:
+            retry_after = _retry_after(rate_limited)
+            _start_cooldown(retry_after if retry_after is not None else current_delay)
+        
+        if not failed:
+            break
+        pending = failed
+        log.warning("Attempt %d: %d of %d inputs failed", attempt, len(failed), len(inputs))
+        
+        if rate_limited is not None:
+            continue
+        
+        log.info("Retrying %d inputs in %.2fs...", len(failed), current_delay)
+        await asyncio.sleep(current_delay)
+    
+    return results
 
 
 def call_with_fallback(
@@ -79,13 +540,10 @@ def call_with_fallback(
             fallback_value="I don't know"
         )
     """
-    if kwargs is None:
-        kwargs = {}
-    
     try:
-        return func(*args, **kwargs)
+        return _bind(func, args, kwargs)()
     except Exception as e:
-        print(f"⚠️  Function failed: {e}. Using fallback: {fallback_value}")
+        log.warning("Function failed: %s. Using fallback: %s", e, fallback_value)
         return fallback_value
 
 
@@ -94,7 +552,11 @@ def call_with_retry_and_fallback(
     args: tuple = (),
     kwargs: dict = None,
     fallback_value: Any = None,
-    max_attempts: int = 3,
+    max_attempts: Optional[int] = None,
+    max_delay: Optional[float] = None,
+    jitter: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (TimeoutError, ConnectionError),
+    is_retryable: Optional[Callable[[Exception], bool]] = is_transient,
 ) -> Any:
     """
     Retry a function, and use a fallback if all retries fail.
@@ -108,22 +570,275 @@ def call_with_retry_and_fallback(
         args: Positional arguments
         kwargs: Keyword arguments
         fallback_value: Return this if all retries fail
-        max_attempts: How many times to try
+        max_attempts: How many times to try (None = current RetryPolicy)
+        max_delay: Never wait longer than this many seconds between attempts
+        jitter: Fraction of each wait that is randomized (see retry_on_failure)
+        retry_on: Exception types worth retrying; other errors skip straight
+                  to the fallback
+        is_retryable: Extra check for retryable errors (default is_transient)
         
     Returns:
-        The function's result, or fallback_value if all attempts fail
+        The function's result (even if that result is None), or
+        fallback_value if all attempts fail
     """
-    if kwargs is None:
-        kwargs = {}
-    
-    result = retry_on_failure(
-        func,
-        args=args,
-        kwargs=kwargs,
-        max_attempts=max_attempts,
+    result = _retry_core(
+        _bind(func, args, kwargs),
+        max_attempts, None, None, max_delay, jitter,
+        retry_on, is_retryable, None,
+        reraise=False,
     )
+    return result.value if result.ok else fallback_value
+
+
+# "No fallback given": a decorated function's fallback may legitimately be None
+_MISSING = object()
+
+
+def retryable(
+    max_attempts: Optional[int] = None,
+    delay: Optional[float] = None,
+    backoff: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    jitter: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (TimeoutError, ConnectionError),
+    is_retryable: Optional[Callable[[Exception], bool]] = is_transient,
+    fallback: Any = _MISSING,
+) -> Callable:
+    """
+    Decorator: retry every call to the function with this policy.
     
-    if result is None:
-        return fallback_value
+    The policy is set once where the function is defined, so call sites
+    just call it. Works for both plain and async functions.
+    
+    Args:
+        fallback: Return this instead of raising when all attempts fail
+                  (or the error is not retryable). Without a fallback the
+                  last error is raised.
+        (other arguments as in retry_on_failure; None = current RetryPolicy)
+        
+    Example:
+        @retryable(max_attempts=5, fallback="(LLM unavailable)")
+        def ask(prompt):
+            return model.generate_content(prompt).text
+    """
+    if max_attempts is not None and max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+    settings = (max_attempts, delay, backoff, max_delay, jitter, retry_on, is_retryable)
+    has_fallback = fallback is not _MISSING
+    
+    def unwrap(result: RetryResult) -> Any:
+        if result.ok:
+            return result.value
+        if has_fallback:
+            return fallback
+        raise result.error
+    
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return unwrap(await _retry_core_async(
+                    _bind(func, args, kwargs), *settings, reraise=not has_fallback
+                ))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return unwrap(_retry_core(
+                    _bind(func, args, kwargs), *settings, None, reraise=not has_fallback
+                ))
+        return wrapper
+    
+    return decorator
+
+
+class CircuitOpenError(Exception):
+    """Raised when CircuitBreaker refuses a call because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a service is down, instead of waiting on every call.
+    
+    States:
+    - CLOSED: calls go through; consecutive failures are counted
+    - OPEN: after failure_threshold failures in a row, calls are refused
+      (CircuitOpenError) until reset_timeout seconds have passed
+    - HALF_OPEN: one probe call is let through (others are refused while
+      it runs); success closes the circuit, failure opens it again
+    
+    Example:
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+        try:
+            response = breaker.call(model.generate_content, prompt)
+        except CircuitOpenError:
+            response = None  # Use a fallback, don't wait on the API
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._probing = False  # A half-open probe call is in flight
+        self._lock = threading.Lock()
+    
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Call func(*args, **kwargs) through the breaker.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open (func is not called)
+            Whatever func raises (the failure is counted first)
+        """
+        probe = self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        else:
+            self._record_success()
+        finally:
+            if probe:
+                self._end_probe()
+        return result
+    
+    async def call_async(self, coro_factory: Callable, *args, **kwargs) -> Any:
+        """Async version of call(): awaits coro_factory(*args, **kwargs)."""
+        probe = self._before_call()
+        try:
+            result = await coro_factory(*args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        else:
+            self._record_success()
+        finally:
+            if probe:
+                self._end_probe()
+        return result
+    
+    def _before_call(self) -> bool:
+        """
+        Refuse the call while open; move to half-open once the timeout passes.
+        
+        Returns:
+            True if this call is the half-open probe (end it with _end_probe)
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"Circuit open, retry in {remaining:.0f}s")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError("Circuit half-open, probe call in progress")
+                self._probing = True
+                return True
+            return False
+    
+    def _end_probe(self):
+        """Let the next caller probe if this one ended without a verdict (e.g. cancelled)."""
+        with self._lock:
+            self._probing = False
+    
+    def _record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failure_count = 0
+    
+    def _record_failure(self):
+        """Count a failure and open the circuit if needed."""
+        with self._lock:
+            self.failure_count += 1
+            if self.state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    log.warning("Circuit opened after %d failures", self.failure_count)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def memoize(ttl: float = 300.0, max_size: int = 256) -> Callable:
+    """
+    Decorator: remember results so repeated calls skip the work.
+    
+    Results are kept in an LRU of max_size entries, each valid for ttl
+    seconds, keyed by the call arguments themselves (so they must be
+    hashable). Failed calls are not cached. For async functions the pending call itself is cached, so
+    identical calls made while it is in flight share one request.
+    
+    Only use this where a repeated answer is acceptable: LLM output is
+    non-deterministic, and a memoized call always returns the first one.
+    
+    Example:
+        @memoize(ttl=300, max_size=256)
+        def ask(prompt):
+            return model.generate_content(prompt).text
+        
+        ask.cache_clear()       # Forget everything
+        ask.cache_discard(p)    # Forget the result of ask(p)
+    """
+    def decorator(func: Callable) -> Callable:
+        cache = OrderedDict()  # key -> (timestamp, result or future)
+        
+        def make_key(args, kwargs) -> tuple:
+            # The arguments themselves, not their repr: two values can
+            # print the same (e.g. truncated arrays) yet be different
+            return args, frozenset(kwargs.items())
+        
+        def lookup(key):
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > ttl:
+                del cache[key]
+                return None
+            cache.move_to_end(key)
+            return entry
+        
+        def store(key, value):
+            cache[key] = (time.monotonic(), value)
+            cache.move_to_end(key)
+            while len(cache) > max_size:
+                cache.popitem(last=False)
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                entry = lookup(key)
+                if entry is None:
+                    future = asyncio.ensure_future(func(*args, **kwargs))
+                    store(key, future)
+                else:
+                    future = entry[1]
+                try:
+                    # shield: one caller being cancelled doesn't cancel the shared call
+                    return await asyncio.shield(future)
+                except Exception:
+                    if cache.get(key, (None, None))[1] is future:
+                        del cache[key]
+                    raise
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                entry = lookup(key)
+                if entry is not None:
+                    return entry[1]
+                result = func(*args, **kwargs)
+                store(key, result)
+                return result
+        
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_discard = lambda *args, **kwargs: cache.pop(make_key(args, kwargs), None)
+        return wrapper
     
-    return result
+    return decorator
@@ -0,0 +1,7 @@
+"""Shared pytest setup for the llm_module tests."""
+
+import os
+import sys
+
+# Modules import each other by bare name, so put llm_module/ on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+"""Behavior tests for cache.py."""
+
+import time
+
+import pytest
+
+from cache import ResponseCache
+
+
+def test_exact_hit_and_miss():
+    cache = ResponseCache()
+    cache.put("hello", "m", "hi")
+    assert cache.get("hello", "m") == "hi"
+    assert cache.get("hello", "other-model") is None
+    assert cache.get("bye", "m") is None
+
+
+def test_exact_tier_is_lru():
+    cache = ResponseCache(max_size=2)
+    cache.put("a", "m", "1")
+    cache.put("b", "m", "2")
+    cache.get("a", "m")
+    cache.put("c", "m", "3")  # Evicts b, the least recently used
+    assert cache.get("a", "m") == "1"
+    assert cache.get("b", "m") is None
+    assert len(cache) == 2
+
+
+def test_exact_tier_expires():
+    cache = ResponseCache(ttl=0.01)
+    cache.put("a", "m", "1")
+    time.sleep(0.02)
+    assert cache.get("a", "m") is None
+    assert len(cache) == 0
+
+
+def test_clear():
+    cache = ResponseCache()
+    cache.put("a", "m", "1")
+    cache.clear()
+    assert cache.get("a", "m") is None
+
+
+def test_configure_cache_replaces_shared_cache(monkeypatch):
+    pytest.importorskip("google.generativeai")
+    import llm_client
+
+    monkeypatch.setattr(llm_client, "_RESPONSE_CACHE", llm_client._RESPONSE_CACHE)
+    cache = llm_client.configure_cache(max_size=8, semantic=True)
+    assert llm_client._RESPONSE_CACHE is cache
+    assert cache.max_size == 8
+
+
+@pytest.fixture
+def semantic_cache(monkeypatch):
+    """A semantic ResponseCache whose embeddings come from a fixed table."""
+    np = pytest.importorskip("numpy")
+    vectors = {
+        "what is python": [1.0, 0.0, 0.0],
+        "what's python": [0.99, 0.1, 0.0],
+        "weather today": [0.0, 1.0, 0.0],
+    }
+    cache = ResponseCache(ttl=60, semantic=True, similarity_threshold=0.9)
+    cache.embedded = []
+
+    def embed(prompt):
+        cache.embedded.append(prompt)
+        return np.asarray(vectors[prompt], dtype=np.float32)
+
+    monkeypatch.setattr(cache, "_embed", embed)
+    return cache
+
+
+def test_semantic_hit_for_similar_prompt(semantic_cache):
+    semantic_cache.put("what is python", "m", "A language")
+    assert semantic_cache.get("what's python", "m") == "A language"
+    assert semantic_cache.get("weather today", "m") is None
+
+
+def test_semantic_tier_respects_ttl(semantic_cache):
+    semantic_cache.put("what is python", "m", "A language")
+    semantic_cache.ttl = 0.01
+    time.sleep(0.02)
+    assert semantic_cache.get("what's python", "m") is None
+
+
+def test_miss_then_put_embeds_once(semantic_cache):
+    semantic_cache.put("what is python", "m", "A language")
+    assert semantic_cache.get("weather today", "m") is None
+    semantic_cache.put("weather today", "m", "Sunny")
+    assert semantic_cache.embedded.count("weather today") == 1
+
+
+def test_semantic_index_grows_and_wraps(semantic_cache):
+    semantic_cache.max_size = 20
+    for i in range(25):
+        semantic_cache.put("what is python", "m", f"answer {i}")
+    index = semantic_cache._semantic["m"]
+    assert index._size == 20
+    assert semantic_cache.get("what's python", "m").startswith("answer")
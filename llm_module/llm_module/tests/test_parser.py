@@ -0,0 +1,128 @@
+"""Behavior tests for parser.py."""
+
+import time
+
+from parser import (
+    _iter_json_spans,
+    json_complete,
+    parse_json,
+    parse_json_batch,
+)
+
+
+def test_skips_bracketed_citation_before_object():
+    result = parse_json('Result [1]: {"name": "a"}', required_keys=["name"])
+    assert result.success, result.error
+    assert result.data == {"name": "a"}
+    
+    result = parse_json('Sources [2] say {"name": "b"}', required_keys=["name"])
+    assert result.success, result.error
+    assert result.data == {"name": "b"}
+
+
+def test_non_object_only_is_schema_violation():
+    result = parse_json("Only [1] here", required_keys=["name"])
+    assert not result.success
+    assert result.data == [1]
+    assert "expected a JSON object" in result.error
+
+
+def test_array_allowed_without_schema():
+    result = parse_json("Numbers: [1, 2]")
+    assert result.success
+    assert result.data == [1, 2]
+
+
+def test_nested_object_is_found_whole():
+    result = parse_json('Here: {"a": {"b": [1, 2]}, "c": 3} done')
+    assert result.success
+    assert result.data == {"a": {"b": [1, 2]}, "c": 3}
+
+
+def test_braces_inside_strings_are_ignored():
+    result = parse_json('Note {"text": "a } and a { inside"} end')
+    assert result.success
+    assert result.data == {"text": "a } and a { inside"}
+
+
+def test_quotes_in_prose_do_not_hide_json():
+    result = parse_json('He said "hi" and then {"name": "a"}', required_keys=["name"])
+    assert result.success
+    assert result.data == {"name": "a"}
+
+
+def test_no_structure_and_empty():
+    assert parse_json("no json here").error == "No JSON structure found"
+    assert parse_json("   ").error == "Empty response"
+
+
+def test_valid_inner_object_inside_unclosed_outer():
+    result = parse_json('{"broken": {"name": "a"}', required_keys=["name"])
+    assert result.success
+    assert result.data == {"name": "a"}
+
+
+def test_spans_are_tried_outermost_first():
+    spans = list(_iter_json_spans('x {"a": [1]} y [2]'))
+    assert spans == [(2, 12), (8, 11), (15, 18)]
+
+
+def test_malformed_output_is_linear_time():
+    # Used to rescan from every opener: ~20 s for this input
+    start = time.perf_counter()
+    result = parse_json('x {"a": 1' * 8000)
+    assert not result.success
+    assert time.perf_counter() - start < 1.0
+    
+    start = time.perf_counter()
+    assert not parse_json("{" * 20000).success
+    assert time.perf_counter() - start < 1.0
+
+
+def test_json_complete():
+    assert not json_complete('{"name": "a", "ag')
+    assert json_complete('{"name": "a", "age": 1} trailing')
+    assert not json_complete("no json")
+
+
+def test_json_complete_waits_for_the_object():
+    assert not json_complete('Based on source [1], here is the JSON: {"name": "Al')
+    assert json_complete('Based on source [1], here is the JSON: {"name": "Al"}')
+    assert not json_complete("[1, 2]")
+
+
+def test_json_complete_checks_required_keys():
+    partial = '{"person": {"name": "a", "age": 1}, "loc'
+    assert json_complete(partial)
+    assert not json_complete(partial, required_keys=["person", "location"])
+    assert json_complete(partial + 'ation": "x"}', required_keys=["person", "location"])
+
+
+def test_validation_steps_are_readable():
+    result = parse_json('{"name": "a"}', required_keys=["name", "age"])
+    assert any("Missing required keys" in step for step in result.validation_steps)
+    assert result.validation_steps == result.steps_str()
+
+
+def test_schema_checks():
+    assert not parse_json('{"name": "a"}', required_keys=["name", "age"]).success
+    assert not parse_json('{"name": "a", "x": 1}', required_keys=["name"]).success
+    assert parse_json('{"name": "a", "x": 1}', required_keys=["name"], allow_extra_keys=True).success
+
+
+def test_parse_json_batch_matches_parse_json():
+    texts = [
+        '{"name": "a", "age": 1}',
+        'Sure: {"name": "b", "age": 2}',
+        '{"name": "c"}',
+        '{"name": "d", "age": 4, "x": 0}',
+        "[1, 2]",
+        "",
+        "not json",
+    ]
+    keys = ["name", "age"]
+    for batch, single in zip(parse_json_batch(texts, keys), (parse_json(t, keys) for t in texts)):
+        assert batch.success == single.success
+        assert batch.data == single.data
+        assert batch.error == single.error
+        assert batch.validation_steps == single.validation_steps
@@ -0,0 +1,61 @@
+"""Behavior tests for prompts.py."""
+
+import pytest
+
+import prompts
+from prompts import (
+    _compile_template,
+    format_prompt,
+    format_prompt_batch,
+    get_template,
+    TEMPLATES,
+)
+
+
+def test_batch_numbers_items():
+    prompt = format_prompt_batch(
+        "structured_info_batch",
+        [{"text": "Alice, 28, NYC"}, {"text": "Bob, 40, LA"}],
+    )
+    assert "Text 1: Alice, 28, NYC\nText 2: Bob, 40, LA" in prompt
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATES))
+def test_compiled_render_matches_format(name):
+    variables = {
+        "question": "What is {x}?",
+        "text": "Alice, 28, NYC",
+        "categories": "a, b",
+        "required_keys": "name, age",
+        "items": "Text 1: x",
+    }
+    assert format_prompt(name, **variables) == TEMPLATES[name].format(**variables)
+
+
+def test_compiled_template_edge_cases():
+    assert _compile_template("")() == ""
+    assert _compile_template("no fields")() == "no fields"
+    assert _compile_template("{a}{b}")(a=1, b=2, c=3) == "12"
+    assert _compile_template("{{literal}} {a}")(a="x") == "{literal} x"
+    with pytest.raises(KeyError):
+        _compile_template("Hi {name}")()
+
+
+def test_specs_fall_back_to_format():
+    assert _compile_template("{x:>4}|{y!r}")(x=1, y="s") == "   1|'s'"
+
+
+def test_missing_variable_raises_key_error():
+    with pytest.raises(KeyError):
+        format_prompt("qa")
+
+
+def test_edited_template_is_recompiled(monkeypatch):
+    monkeypatch.setitem(TEMPLATES, "qa", "Q: {question}")
+    monkeypatch.setattr(prompts, "_COMPILED", dict(prompts._COMPILED))
+    assert format_prompt("qa", question="why") == "Q: why"
+
+
+def test_unknown_template():
+    with pytest.raises(ValueError):
+        get_template("nope")
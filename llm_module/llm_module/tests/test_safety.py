@@ -0,0 +1,396 @@
+"""Behavior tests for safety.py: retry core, CircuitBreaker, memoize and retryable."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import safety
+from safety import (
+    _backoff_schedule,
+    call_with_retry_and_fallback,
+    CircuitBreaker,
+    CircuitOpenError,
+    memoize,
+    retry_on_failure,
+    retry_on_failure_async,
+    retry_on_failure_batch,
+    retryable,
+    RetryPolicy,
+    with_policy,
+)
+
+
+FAST = dict(delay=0.001, max_delay=0.01)
+
+
+@pytest.fixture(autouse=True)
+def no_cooldown(monkeypatch):
+    monkeypatch.setattr(safety, "_cooldown_until", 0.0)
+
+
+def flaky(failures, error=TimeoutError):
+    """A function that raises `error` on its first `failures` calls."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error() if isinstance(error, type) else error
+        return "ok"
+
+    func.calls = calls
+    return func
+
+
+def test_zero_jitter_gives_fixed_delays(monkeypatch):
+    waits = []
+    monkeypatch.setattr(threading.Event, "wait", lambda self, timeout=None: waits.append(timeout))
+    retry_on_failure(flaky(3), max_attempts=4, delay=1.0, backoff=2.0, max_delay=3.0, jitter=0.0)
+    assert waits == [1.0, 2.0, 3.0]
+
+
+class StatusError(Exception):
+    """Stands in for a google.api_core error: only carries an HTTP code."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_non_retryable_error_is_raised():
+    func = flaky(1, ValueError)
+    with pytest.raises(ValueError):
+        retry_on_failure(func, max_attempts=3, **FAST)
+    assert len(func.calls) == 1
+
+
+def test_transient_status_codes_are_retried_by_default():
+    func = flaky(1, StatusError(503))
+    assert retry_on_failure(func, max_attempts=2, **FAST).ok
+
+    with pytest.raises(StatusError):
+        retry_on_failure(flaky(1, StatusError(400)), max_attempts=2, **FAST)
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(flaky(1))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    func = flaky(0)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(func)
+    assert func.calls == []
+
+
+def test_breaker_lets_one_probe_through_then_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    with pytest.raises(TimeoutError):
+        breaker.call(flaky(1))
+
+    async def run():
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            return "ok"
+
+        first = asyncio.ensure_future(breaker.call_async(probe))
+        await asyncio.sleep(0)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call_async(probe)
+        release.set()
+        return await first
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failure_count == 0
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.0)
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            breaker.call(flaky(1))
+    with pytest.raises(TimeoutError):
+        breaker.call(flaky(1))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker._probing
+
+
+def test_rate_limit_starts_shared_cooldown(monkeypatch):
+    cooldowns = []
+    monkeypatch.setattr(safety, "_start_cooldown", cooldowns.append)
+    result = retry_on_failure(flaky(1, StatusError(429)), max_attempts=2, delay=0.5, max_delay=0.5, jitter=0.0)
+    assert result.ok
+    assert cooldowns == [0.5]
+
+
+def test_rate_limit_on_last_attempt_starts_cooldown(monkeypatch):
+    cooldowns = []
+    monkeypatch.setattr(safety, "_start_cooldown", cooldowns.append)
+    result = retry_on_failure(flaky(5, StatusError(429)), max_attempts=1, delay=0.5, max_delay=0.5, jitter=0.0)
+    assert not result.ok
+    assert cooldowns == [0.5]
+
+    async def limited():
+        raise StatusError(429)
+
+    asyncio.run(retry_on_failure_async(limited, max_attempts=2, delay=0.5, max_delay=0.5, jitter=0.0))
+    assert cooldowns == [0.5, 0.5, 0.5]
+
+    asyncio.run(retry_on_failure_batch(lambda x: limited(), [1], max_attempts=1, delay=0.5, max_delay=0.5, jitter=0.0))
+    assert cooldowns == [0.5, 0.5, 0.5, 0.5]
+
+
+def test_cooldown_delays_every_caller():
+    safety._start_cooldown(0.05)
+    assert safety.should_wait() > 0
+    start = time.monotonic()
+    assert retry_on_failure(lambda: "ok", **FAST).ok
+    assert time.monotonic() - start >= 0.04
+    assert safety.should_wait() == 0.0
+
+
+def test_cancel_event_stops_before_calling():
+    cancel = threading.Event()
+    cancel.set()
+    func = flaky(0)
+    result = retry_on_failure(func, cancel_event=cancel, **FAST)
+    assert not result.ok
+    assert result.attempts == 0
+    assert func.calls == []
+
+
+def test_async_retry():
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError()
+        return "ok"
+
+    result = asyncio.run(retry_on_failure_async(func, max_attempts=3, **FAST))
+    assert result.ok and result.value == "ok"
+    assert result.attempts == 3
+
+
+def test_async_exhaustion_returns_last_error():
+    async def func():
+        raise TimeoutError()
+
+    result = asyncio.run(retry_on_failure_async(func, max_attempts=2, **FAST))
+    assert not result.ok
+    assert isinstance(result.error, TimeoutError)
+    assert result.attempts == 2
+
+
+def test_memoize_caches_and_discards():
+    calls = []
+
+    @memoize(ttl=60)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3]
+
+    square.cache_discard(3)
+    assert square(3) == 9
+    assert calls == [3, 3]
+
+    square.cache_clear()
+    square(3)
+    assert calls == [3, 3, 3]
+
+
+def test_memoize_keys_on_arguments_not_repr():
+    class Same:
+        def __repr__(self):
+            return "Same()"
+
+    @memoize()
+    def ident(x):
+        return x
+
+    a, b = Same(), Same()
+    assert ident(a) is a
+    assert ident(b) is b
+    assert ident(x=a) is a
+    assert ident(x=b) is b
+
+
+def test_memoize_expires():
+    calls = []
+
+    @memoize(ttl=0.01)
+    def ident(x):
+        calls.append(x)
+        return x
+
+    ident(1)
+    time.sleep(0.02)
+    ident(1)
+    assert calls == [1, 1]
+
+
+def test_memoize_evicts_least_recently_used():
+    calls = []
+
+    @memoize(max_size=2)
+    def ident(x):
+        calls.append(x)
+        return x
+
+    ident(1)
+    ident(2)
+    ident(1)
+    ident(3)  # Evicts 2, the least recently used
+    ident(1)
+    assert calls == [1, 2, 3]
+    ident(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_memoize_does_not_cache_failures():
+    func = flaky(1)
+    cached = memoize()(func)
+    with pytest.raises(TimeoutError):
+        cached()
+    assert cached() == "ok"
+    assert len(func.calls) == 2
+
+
+def test_memoize_async_shares_in_flight_call():
+    calls = []
+
+    @memoize()
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x
+
+    async def run():
+        return await asyncio.gather(fetch(1), fetch(1), fetch(2))
+
+    assert asyncio.run(run()) == [1, 1, 2]
+    assert calls == [1, 2]
+
+
+def test_memoize_async_drops_failed_call():
+    calls = []
+
+    @memoize()
+    async def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise TimeoutError()
+        return "ok"
+
+    async def run():
+        with pytest.raises(TimeoutError):
+            await fetch()
+        return await fetch()
+
+    assert asyncio.run(run()) == "ok"
+    assert len(calls) == 2
+
+
+def test_fallback_covers_non_retryable_error():
+    value = call_with_retry_and_fallback(flaky(1, ValueError), fallback_value="fb", max_attempts=3)
+    assert value == "fb"
+
+
+def test_batch_retries_only_failures():
+    calls = []
+
+    async def func(x):
+        calls.append(x)
+        if x == 2 and calls.count(2) < 2:
+            raise TimeoutError()
+        if x == 3:
+            raise ValueError()
+        return x * 10
+
+    results = asyncio.run(retry_on_failure_batch(func, [1, 2, 3], max_attempts=3, **FAST))
+    assert [r.value for r in results] == [10, 20, None]
+    assert [r.attempts for r in results] == [1, 2, 1]
+    assert isinstance(results[2].error, ValueError)
+    assert sorted(calls) == [1, 2, 2, 3]
+
+
+def test_backoff_schedule_is_capped():
+    assert _backoff_schedule(1.0, 2.0, 3.0, 4) == (1.0, 2.0, 3.0, 3.0)
+    assert _backoff_schedule(0.5, 3.0, 30.0, 3) == (0.5, 1.5, 4.5)
+
+
+def test_policy_supplies_defaults():
+    func = flaky(10)
+    with with_policy(RetryPolicy(max_attempts=2, delay=0.001, max_delay=0.01)):
+        result = retry_on_failure(func)
+    assert result.attempts == 2
+    assert len(func.calls) == 2
+
+
+def test_success_returns_retry_result():
+    result = retry_on_failure(lambda: None, **FAST)
+    assert result.ok
+    assert result.value is None
+    assert result.attempts == 1
+    assert result.error is None
+
+
+def test_retries_until_success():
+    func = flaky(2)
+    result = retry_on_failure(func, max_attempts=3, **FAST)
+    assert result.ok and result.value == "ok"
+    assert result.attempts == 3
+
+
+def test_exhaustion_carries_last_error():
+    result = retry_on_failure(flaky(10), max_attempts=3, **FAST)
+    assert not result.ok
+    assert isinstance(result.error, TimeoutError)
+    assert result.attempts == 3
+
+
+def test_max_attempts_below_one_is_rejected():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+    with pytest.raises(ValueError):
+        retry_on_failure(lambda: 1, max_attempts=0)
+    with pytest.raises(ValueError):
+        retryable(max_attempts=0)
+
+
+def test_retryable_sync_and_fallback():
+    func = flaky(1)
+    assert retryable(max_attempts=2, **FAST)(func)() == "ok"
+
+    with pytest.raises(TimeoutError):
+        retryable(max_attempts=2, **FAST)(flaky(10))()
+
+    assert retryable(max_attempts=2, fallback=None, **FAST)(flaky(10))() is None
+    assert retryable(fallback="fb", **FAST)(flaky(1, ValueError))() == "fb"
+
+
+def test_retryable_async():
+    calls = []
+
+    @retryable(max_attempts=3, **FAST)
+    async def ask(prompt):
+        calls.append(prompt)
+        if len(calls) < 2:
+            raise ConnectionError()
+        return prompt.upper()
+
+    assert asyncio.run(ask("hi")) == "HI"
+    assert calls == ["hi", "hi"]
@@ -0,0 +1,43 @@
+"""Check that the module structure is correct and everything imports properly.
+
+Run with:  pytest tests/
+"""
+
+from llm_client import call_gemini
+from prompts import format_prompt, get_template, TEMPLATES
+from parser import parse_json, validate_choice, validate_length, ParseResult
+from safety import retry_on_failure, call_with_fallback, call_with_retry_and_fallback
+from logger import get_logger, Logger
+
+
+def test_imports():
+    """Every public entry point is importable and callable."""
+    for obj in (call_gemini, format_prompt, get_template, parse_json,
+                validate_choice, validate_length, retry_on_failure,
+                call_with_fallback, call_with_retry_and_fallback, get_logger):
+        assert callable(obj)
+    assert "qa" in TEMPLATES
+
+
+def test_prompt_formatting():
+    prompt = format_prompt("qa", question="Test question?")
+    assert "Test question?" in prompt
+
+
+def test_parse_json():
+    result = parse_json('{"name": "Alice"}', required_keys=["name"])
+    assert isinstance(result, ParseResult)
+    assert result.success, result.error
+    assert result.data == {"name": "Alice"}
+
+
+def test_validation_detects_invalid_schema():
+    result = parse_json('{"name": "Alice"}', required_keys=["name", "age"])
+    assert not result.success
+    assert result.validation_steps
+
+
+def test_logger():
+    logger = get_logger(enabled=False)  # Disable output for testing
+    assert isinstance(logger, Logger)
+    logger.info("test")
@@ -1,16 +1,117 @@
+import asyncio
+import functools
 import google.generativeai as genai
 import os
+import signal
+import sys
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Use the helpers in llm_module/ (same flat imports as the scripts there)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_module"))
+from llm_client import RETRYABLE_ERRORS
+from safety import CircuitBreaker, CircuitOpenError, memoize, retryable
+from console import read_input
 
-model = genai.GenerativeModel("gemini-2.5-flash")
-print("LLM: Hello! How can I assist you today? (Type 'exit' to quit)")
-while True:
-    user_input = input("You: ")
 
-    if user_input.lower() == "exit":
-        print("LLM: Goodbye 👋")
-        break
+@functools.lru_cache(maxsize=1)
+def get_model():
+    """Configure the SDK and build the model on first use, not at import."""
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    # Answers are memoized (see ask), so sample deterministically: a
+    # replayed answer is then the one the model would give again
+    return genai.GenerativeModel("gemini-2.5-flash", generation_config={"temperature": 0})
 
-    response = model.generate_content(user_input)
-    print("LLM:", response.text)
\ No newline at end of file
+
+async def generate(prompt):
+    return await get_model().generate_content_async(prompt, stream=True)
+
+
+async def warm_up():
+    """Open the API connection while the user types the first prompt."""
+    try:
+        # count_tokens is free and goes over the same async client (and
+        # pooled connection) as generate_content_async, so the first real
+        # request skips DNS, TCP and TLS setup
+        await get_model().count_tokens_async("hi")
+    except Exception:
+        pass  # The first real request connects (and reports errors) itself
+
+
+# Stop calling the API for a while after repeated failures
+breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+
+
+# Repeating a prompt within 5 minutes replays the earlier answer's chunks.
+# The cache sits outside the breaker: a hit never reaches the API, so it
+# neither counts as a breaker success nor is refused while the circuit
+# is open. (Awaiting a stream returns once the first chunk arrives, so
+# errors raised before any output is shown are the ones ask() retries.)
+@memoize(ttl=300, max_size=256)
+@retryable(max_attempts=5, retry_on=RETRYABLE_ERRORS)
+async def ask(prompt):
+    """Send one prompt, retrying transient failures without blocking the loop."""
+    return await breaker.call_async(generate, prompt)
+
+
+async def stream_reply(prompt):
+    """Print the reply chunk by chunk as it arrives."""
+    response = await ask(prompt)
+
+    # Past the first chunk the output is already on screen, so a failure
+    # from here on is reported rather than retried
+    print("LLM: ", end="", flush=True)
+    try:
+        async for chunk in response:
+            print(chunk.text, end="", flush=True)
+    except BaseException:
+        # A half-read stream can't be replayed, so don't reuse it
+        ask.cache_discard(prompt)
+        raise
+    finally:
+        print()
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+
+    warming = asyncio.ensure_future(warm_up())
+
+    print("LLM: Hello! How can I assist you today? (Type 'exit' to quit)")
+    while True:
+        try:
+            user_input = await read_input("You: ")
+        except EOFError:
+            user_input = "exit"
+
+        if user_input.lower() == "exit":
+            print("LLM: Goodbye 👋")
+            warming.cancel()
+            break
+
+        # Ctrl-C while waiting cancels this request, not the whole chat
+        request = asyncio.ensure_future(stream_reply(user_input))
+        try:
+            loop.add_signal_handler(signal.SIGINT, request.cancel)
+            cancel_on_sigint = True
+        except NotImplementedError:  # Windows: Ctrl-C ends the chat instead
+            cancel_on_sigint = False
+        try:
+            await request
+        except asyncio.CancelledError:
+            print("LLM: (Request cancelled.)")
+            continue
+        except CircuitOpenError as e:
+            print(f"LLM: (The model is unavailable right now. {e})")
+            continue
+        except Exception as e:
+            print(f"LLM: (Request failed: {e})")
+            continue
+        finally:
+            if cancel_on_sigint:
+                loop.remove_signal_handler(signal.SIGINT)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nLLM: Goodbye 👋")